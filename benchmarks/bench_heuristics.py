@@ -0,0 +1,54 @@
+# Rank every combination of the built-in cell and value orders by the number
+# of search nodes and the wall time they need on the shared corpus.
+#
+#     python -m benchmarks.bench_heuristics [--timeout SECONDS]
+import argparse
+import signal
+import time
+
+from sodoku import solve_with_stats, Heuristic, CELL_ORDERS, VALUE_ORDERS, StrategyException
+
+from benchmarks.bench_solvers import Timeout, _alarm
+from benchmarks.corpus import boards
+
+
+def run_heuristic(heuristic, puzzles, timeout):
+    nodes = 0
+    elapsed = 0.0
+    failed = 0
+    for name, board in puzzles:
+        signal.alarm(timeout)
+        started = time.perf_counter()
+        try:
+            _, _, stats = solve_with_stats(board, displayer=lambda string: None, heuristic=heuristic)
+            nodes += stats.nodes
+        except (Timeout, StrategyException):
+            failed += 1
+        finally:
+            signal.alarm(0)
+        elapsed += time.perf_counter() - started
+    return nodes, elapsed, failed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--timeout', type=int, default=10, help='seconds allowed per puzzle')
+    args = parser.parse_args()
+    signal.signal(signal.SIGALRM, _alarm)
+
+    puzzles = list(boards())
+    results = []
+    for cell_name, select_cell in CELL_ORDERS.items():
+        for value_name, order_values in VALUE_ORDERS.items():
+            nodes, elapsed, failed = run_heuristic(Heuristic(select_cell, order_values), puzzles, args.timeout)
+            results.append((failed, nodes, elapsed, '{}/{}'.format(cell_name, value_name)))
+
+    # Failed puzzles count against a heuristic before nodes do: a timeout
+    # stops the node count early.
+    print('{:<28}{:>10}{:>12}{:>10}'.format('heuristic', 'nodes', 'time', 'failed'))
+    for failed, nodes, elapsed, name in sorted(results):
+        print('{:<28}{:>10}{:>11.2f}s{:>10}'.format(name, nodes, elapsed, failed))
+
+
+if __name__ == '__main__':
+    main()
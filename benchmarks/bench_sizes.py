@@ -0,0 +1,69 @@
+# Time the search solver on random puzzles of every board size.
+#
+#     python -m benchmarks.bench_sizes [--sizes 4 9 16] [--count N] [--clues FRACTION] [--timeout SECONDS]
+import argparse
+import random
+import signal
+import time
+
+from sodoku import Board, solve, geometry
+
+from benchmarks.bench_solvers import Timeout, _alarm
+
+
+def full_grid(size, rng):
+    # The usual shifted pattern grid with its digits, bands and stacks and
+    # the rows and columns inside them shuffled.
+    box_size = geometry(size).box_size
+    digits = rng.sample(range(1, size + 1), size)
+
+    def order():
+        bands = rng.sample(range(box_size), box_size)
+        return [band * box_size + line for band in bands for line in rng.sample(range(box_size), box_size)]
+
+    rows, cols = order(), order()
+    return [digits[(box_size * (row % box_size) + row // box_size + col) % size] for row in rows for col in cols]
+
+
+def make_puzzles(size, count, clues, seed=0):
+    rng = random.Random(seed)
+    puzzles = []
+    for _ in range(count):
+        grid = full_grid(size, rng)
+        puzzles.append([value if rng.random() < clues else None for value in grid])
+    return puzzles
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[4, 9, 16])
+    parser.add_argument('--count', type=int, default=10)
+    parser.add_argument('--clues', type=float, default=0.5, help='fraction of cells given')
+    parser.add_argument('--timeout', type=int, default=30, help='seconds allowed per puzzle')
+    args = parser.parse_args()
+    signal.signal(signal.SIGALRM, _alarm)
+
+    print('{:<8}{:>10}{:>12}{:>12}{:>10}'.format('size', 'puzzles', 'mean', 'worst', 'failed'))
+    for size in args.sizes:
+        geometry(size)
+        times = []
+        failed = 0
+        for values in make_puzzles(size, args.count, args.clues):
+            board = Board(values=values, size=size)
+            signal.alarm(args.timeout)
+            started = time.perf_counter()
+            try:
+                solved_board, _ = solve(board, displayer=lambda string: None, in_place=True)
+                assert solved_board.is_complete
+                times.append(time.perf_counter() - started)
+            except Timeout:
+                failed += 1
+            finally:
+                signal.alarm(0)
+        mean = sum(times) / len(times) if times else float('nan')
+        print('{:<8}{:>10}{:>11.3f}s{:>11.3f}s{:>10}'.format(
+            '{0}x{0}'.format(size), args.count, mean, max(times, default=float('nan')), failed))
+
+
+if __name__ == '__main__':
+    main()
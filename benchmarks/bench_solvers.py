@@ -0,0 +1,71 @@
+# Compare the search solver with the exact cover and SAT backends on the shared corpus.
+#
+#     python -m benchmarks.bench_solvers [--timeout SECONDS] [--repeat N]
+import argparse
+import signal
+import time
+
+from sodoku import solve, solve_exact_cover, StrategyException
+from sodoku.sat import solve_sat
+
+from benchmarks.corpus import boards
+
+
+class Timeout(Exception):
+    pass
+
+
+def _alarm(signum, frame):
+    raise Timeout()
+
+
+def time_solver(solver, board, timeout, repeat):
+    best = None
+    for _ in range(repeat):
+        signal.alarm(timeout)
+        started = time.perf_counter()
+        try:
+            solved_board, _ = solver(board)
+        except (Timeout, StrategyException):
+            return None
+        finally:
+            signal.alarm(0)
+        elapsed = time.perf_counter() - started
+        if not solved_board.is_complete:
+            return None
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+SOLVERS = (
+    ('search', lambda board: solve(board, displayer=lambda string: None)),
+    ('exact-cover', solve_exact_cover),
+    ('sat', solve_sat),
+)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--timeout', type=int, default=30, help='seconds allowed per puzzle')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    signal.signal(signal.SIGALRM, _alarm)
+
+    print('{:<16}'.format('puzzle') + ''.join('{:>14}'.format(name) for name, _ in SOLVERS))
+    totals = [0.0] * len(SOLVERS)
+    for name, board in boards():
+        row = '{:<16}'.format(name)
+        for column, (_, solver) in enumerate(SOLVERS):
+            elapsed = time_solver(solver, board, args.timeout, args.repeat)
+            if elapsed is None:
+                row += '{:>14}'.format('timeout')
+                totals[column] += args.timeout
+            else:
+                row += '{:>13.2f}ms'.format(elapsed * 1000)
+                totals[column] += elapsed
+        print(row)
+    print('{:<16}'.format('total') + ''.join('{:>13.2f}s'.format(total) for total in totals))
+
+
+if __name__ == '__main__':
+    main()
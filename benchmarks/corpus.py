@@ -0,0 +1,27 @@
+from sodoku import Board
+
+# Puzzles in the one-per-line 81 character format, '.' or '0' for a blank.
+PUZZLES = (
+    ('euler-01', '003020600900305001001806400008102900700000008006708200002609500800203009005010300'),
+    ('test-medium', '981300000005000800000050004508031060043000190060740305600070000004000600000003521'),
+    ('17-clue', '000000010400000000020000000000050407008000300001090000300400200050100000000806000'),
+    ('norvig-hard-1', '4.....8.5.3..........7......2.....6.....8.4......1.......6.3.7.5..2.....1.4......'),
+    ('norvig-hard-2', '52...6.........7.13...........4..8..6......5...........418.........3..2...87.....'),
+    ('hard-53', '..53.....8......2..7..1.5..4....53...1..7...6..32...8..6.5....9..4....3......97..'),
+    ('hard-1-7-9', '1....7.9..3..2...8..96..5....53..9...1..8...26....4...3......1..4......7..7...3..'),
+    ('inkala-2012', '8..........36......7..9.2...5...7.......457.....1...3...1....68..85...1..9....4..'),
+    ('golden-nugget', '.......39.....1..5..3.5.8....8.9...6.7...2...1..4.......9.8..5..2....6..4..7.....'),
+    ('easter-monster', '1.......2.9.4...5...6...7...5.9.3.......7.......85..4.7.....6...3...9.8...2.....1'),
+)
+
+
+def line_values(line):
+    return [int(char) if char in '123456789' else 0 for char in line.strip()]
+
+
+def boards(strategy=None):
+    for name, line in PUZZLES:
+        if strategy is None:
+            yield name, Board(values=line_values(line))
+        else:
+            yield name, Board(strategy, line_values(line))
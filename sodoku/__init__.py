@@ -1 +1,12 @@
-from .core import *
\ No newline at end of file
+from .core import *
+from .compact import CompactBoard, CompactCell
+from .dlx import ExactCover, solve_exact_cover, count_solutions, iter_solutions, has_unique_solution
+from .batch import BatchResult, solve_many
+from .stream import read_puzzles, write_puzzles
+from .generate import DIFFICULTIES, generate, generate_many, grade, random_grid
+from .vectorized import solve_array
+from .variants import DiagonalConstraint, PairConstraint, CageConstraint, diagonal_constraints, anti_knight_constraints, killer_cages
+from .sat import SatSolver, solve_sat
+from .cache import SolutionCache, canonical_form
+from .store import PuzzleStore
+from .fetch import Fetcher, FetchResult, FetchException, fetch_boards, download_boards
@@ -0,0 +1,81 @@
+import multiprocessing
+from collections import namedtuple
+
+from .core import Board, StrategyException, solve
+from .compact import CompactBoard
+from .store import PuzzleStore
+
+BatchResult = namedtuple('BatchResult', ('index', 'puzzle', 'solution'))
+
+
+def quiet_solve(board):
+    return solve(board, displayer=lambda string: None, in_place=True)
+
+
+def pack(puzzle):
+    # Grids travel between processes as 81 raw bytes, not pickled boards.
+    if isinstance(puzzle, Board):
+        return bytes(CompactBoard.from_board(puzzle))
+    if isinstance(puzzle, CompactBoard):
+        return bytes(puzzle)
+    if isinstance(puzzle, str) or isinstance(puzzle, (bytes, bytearray)) and max(puzzle, default=0) > 9:
+        return bytes(CompactBoard.from_line(puzzle))
+    return bytes(CompactBoard(puzzle))
+
+
+_solver = quiet_solve
+_store = None
+
+
+def _set_solver(solver, store=None):
+    # store: a PuzzleStore, or the path of one for a worker to open read only.
+    global _solver, _store
+    _solver = solver
+    _store = PuzzleStore(store, readonly=True) if isinstance(store, str) else store
+
+
+def _solve_packed(task):
+    index, packed = task
+    if _store is not None:
+        solution = _store.get(packed)
+        if solution is not None:
+            return index, packed, bytes(solution)
+    try:
+        solved_board, _ = _solver(CompactBoard(packed).to_board())
+    except StrategyException:
+        return index, packed, None
+    return index, packed, bytes(CompactBoard.from_board(solved_board))
+
+
+def _result(item):
+    index, packed, solution = item
+    return BatchResult(index, CompactBoard(packed), None if solution is None else CompactBoard(solution))
+
+
+def _record(store, item):
+    # Only this process writes to the store; workers read it.
+    _, packed, solution = item
+    if store is not None and solution is not None and packed not in store:
+        store[packed] = solution
+    return _result(item)
+
+
+def solve_many(puzzles, workers=None, chunksize=16, ordered=True, solver=quiet_solve, store=None):
+    # store: a PuzzleStore answering puzzles it already holds and keeping
+    # the new solutions.
+    tasks = ((index, pack(puzzle)) for index, puzzle in enumerate(puzzles))
+    if workers == 1:
+        previous = _solver, _store
+        _set_solver(solver, store)
+        try:
+            for item in map(_solve_packed, tasks):
+                yield _record(store, item)
+        finally:
+            _set_solver(*previous)
+        return
+
+    store_path = None if store is None else store.path
+    with multiprocessing.Pool(workers, initializer=_set_solver, initargs=(solver, store_path)) as pool:
+        mapper = pool.imap if ordered else pool.imap_unordered
+        for item in mapper(_solve_packed, tasks, chunksize):
+            yield _record(store, item)
@@ -0,0 +1,202 @@
+from collections import OrderedDict
+from itertools import permutations, product
+
+from .core import Position, StrategyException, CELL_COUNT
+from .compact import CompactBoard
+from .batch import quiet_solve
+
+SIZE = 9
+BOX = 3
+
+# Canonical forms.  Two grids are equivalent when one turns into the other
+# by transposing, reordering bands, stacks, rows within a band and columns
+# within a stack, and relabelling digits.  Rows and columns are first
+# sorted by keys no such transform changes (clue counts); the orders left
+# open by ties are all tried and the smallest grid, with digits relabelled in
+# order of first appearance, is the canonical form.  Past max_orders tried
+# orders the result is still a valid transform but may not be canonical,
+# which only costs cache hits.
+
+
+class Transform:
+    # cells[k] is the source index of output cell k, labels maps a source
+    # digit to the output digit (0 stays 0).
+    __slots__ = ('cells', 'labels')
+
+    def __init__(self, cells, labels):
+        self.cells = cells
+        self.labels = labels
+
+    def apply(self, values):
+        labels = self.labels
+        return bytes(labels[values[source]] for source in self.cells)
+
+    def invert(self, values):
+        inverse = [0] * (SIZE + 1)
+        for digit, label in enumerate(self.labels):
+            inverse[label] = digit
+        result = bytearray(CELL_COUNT)
+        for index, source in enumerate(self.cells):
+            result[source] = inverse[values[index]]
+        return bytes(result)
+
+
+def _relabel(values, cells):
+    labels = [0] * (SIZE + 1)
+    output = bytearray(CELL_COUNT)
+    next_label = 1
+    for index, source in enumerate(cells):
+        value = values[source]
+        if value:
+            if not labels[value]:
+                labels[value] = next_label
+                next_label += 1
+            output[index] = labels[value]
+    for value in range(1, SIZE + 1):
+        if not labels[value]:
+            labels[value] = next_label
+            next_label += 1
+    return bytes(output), labels
+
+
+def _line_orders(values, transposed):
+    # Every order of the rows (of the columns when transposed) that the
+    # invariant keys allow, as tuples of line numbers.
+    def at(line, position):
+        return values[position * SIZE + line] if transposed else values[line * SIZE + position]
+
+    crossing = [sum(1 for line in range(SIZE) if at(line, position)) for position in range(SIZE)]
+    keys = [(sum(1 for position in range(SIZE) if at(line, position)),
+             tuple(sorted(crossing[position] for position in range(SIZE) if at(line, position))))
+            for line in range(SIZE)]
+
+    def tied_orders(items, key):
+        # All orders of items sorted by key, permuting only equal keys.
+        ordered = sorted(items, key=key)
+        groups = []
+        for item in ordered:
+            if groups and key(groups[-1][0]) == key(item):
+                groups[-1].append(item)
+            else:
+                groups.append([item])
+        for choice in product(*(permutations(group) for group in groups)):
+            yield tuple(item for group in choice for item in group)
+
+    band_lines = [tuple(range(band * BOX, band * BOX + BOX)) for band in range(BOX)]
+    within = [list(tied_orders(lines, keys.__getitem__)) for lines in band_lines]
+    band_key = [tuple(sorted(keys[line] for line in lines)) for lines in band_lines]
+    for bands in tied_orders(range(BOX), band_key.__getitem__):
+        for inner in product(*(within[band] for band in bands)):
+            yield tuple(line for lines in inner for line in lines)
+
+
+def canonical_form(values, max_orders=20000):
+    # The canonical form of 81 values (0 for a blank) as bytes, and the
+    # Transform taking values to it.
+    values = bytes(values)
+    best = None
+    tried = 0
+    for transposed in (False, True):
+        if transposed:
+            source = [0] * CELL_COUNT
+            for index in range(CELL_COUNT):
+                source[index] = (index % SIZE) * SIZE + index // SIZE
+        else:
+            source = list(range(CELL_COUNT))
+        rows = list(_line_orders(values, transposed))
+        cols = list(_line_orders(values, not transposed))
+        for row_order in rows:
+            for col_order in cols:
+                cells = [source[row * SIZE + col] for row in row_order for col in col_order]
+                output, labels = _relabel(values, cells)
+                if best is None or output < best[0]:
+                    best = output, cells, labels
+                tried += 1
+                if tried >= max_orders:
+                    return best[0], Transform(tuple(best[1]), best[2])
+    return best[0], Transform(tuple(best[1]), best[2])
+
+
+class SolutionCache:
+    # An LRU cache of solutions in front of a solver.  Exact repeats are
+    # found by their own values, other puzzles by their canonical form.
+    # store, when given, is a further mapping of canonical form bytes to
+    # solution bytes, for example a dbm file or a PuzzleStore, consulted and
+    # filled behind the in-memory entries.
+    def __init__(self, maxsize=4096, store=None, solver=quiet_solve, max_orders=20000):
+        self.maxsize = maxsize
+        self.store = store
+        self.solver = solver
+        self.max_orders = max_orders
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, key):
+        solution = self.entries.get(key)
+        if solution is not None:
+            self.entries.move_to_end(key)
+        return solution
+
+    def _put(self, key, solution):
+        self.entries[key] = solution
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def lookup(self, values):
+        # The solution bytes for 81 values, or None.
+        values = bytes(values)
+        solution = self._get(values)
+        if solution is not None:
+            return solution
+
+        form, transform = canonical_form(values, self.max_orders)
+        canonical = self._get(form)
+        if canonical is None and self.store is not None:
+            canonical = self.store.get(form)
+            if canonical is not None:
+                canonical = bytes(canonical)
+                self._put(form, canonical)
+        if canonical is None:
+            return None
+        solution = transform.invert(canonical)
+        self._put(values, solution)
+        return solution
+
+    def add(self, values, solution):
+        values, solution = bytes(values), bytes(solution)
+        form, transform = canonical_form(values, self.max_orders)
+        canonical = transform.apply(solution)
+        self._put(values, solution)
+        self._put(form, canonical)
+        if self.store is not None:
+            self.store[form] = canonical
+
+    def solve(self, board, history=None):
+        # Same contract as solve(): a solved copy of board and the positions
+        # filled in.  Boards with variant constraints or of another size are
+        # passed straight to the solver.
+        if board.variants or board.geometry.size != SIZE:
+            solved_board, positions = self.solver(board.copy())
+            return solved_board, (list(history) if history else []) + list(positions)
+        values = bytes(CompactBoard.from_board(board))
+        solution = self.lookup(values)
+        if solution is None:
+            self.misses += 1
+            solved_board, _ = self.solver(board.copy())
+            solution = bytes(CompactBoard.from_board(solved_board))
+            if not solved_board.is_complete:
+                raise StrategyException('Ran out of ideas.')
+            self.add(values, solution)
+        else:
+            self.hits += 1
+
+        history = list(history) if history else []
+        for index, (given, value) in enumerate(zip(values, solution)):
+            if not given:
+                history.append(Position(index % SIZE, index // SIZE, value))
+        return CompactBoard(solution).to_board(type(board.strategy)), history
+
+    def __len__(self):
+        return len(self.entries)
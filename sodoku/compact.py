@@ -0,0 +1,194 @@
+from .core import Board, NoGuessing, SodokuException, parse_values
+from .core import CELL_COUNT, ROW_UNITS, COL_UNITS, BOX_UNITS, ROW_OF, COL_OF, BOX_OF, PEERS
+from .core import ConstraintExceptionRow, ConstraintExceptionCol, ConstraintExceptionBox
+from .core import VALUE_BIT, FULL_MASK, MASK_VALUES, MASK_SIZE
+
+SIZE = 9
+
+# bytes.translate() tables between the 81 character line format and cell values.
+LINE_TO_VALUES = bytearray([255]) * 256
+LINE_TO_VALUES[ord('.')] = LINE_TO_VALUES[ord('0')] = 0
+for _value in range(1, SIZE + 1):
+    LINE_TO_VALUES[ord(str(_value))] = _value
+LINE_TO_VALUES = bytes(LINE_TO_VALUES)
+
+
+class CompactBoard:
+    __slots__ = ('values',)
+
+    def __init__(self, values=None):
+        if values is None:
+            self.values = bytearray(CELL_COUNT)
+        else:
+            self.values = bytearray(values)
+            if len(self.values) != CELL_COUNT:
+                raise SodokuException('A compact board needs {} values, got {}'.format(
+                    CELL_COUNT, len(self.values)))
+
+    @classmethod
+    def from_board(cls, board):
+        if board.geometry.size != SIZE:
+            raise SodokuException('A compact board is 9x9, got a {0}x{0} board'.format(board.geometry.size))
+        return cls(0 if cell.value is None else cell.value for cell in board.cells)
+
+    @classmethod
+    def from_line(cls, line):
+        if isinstance(line, str):
+            line = line.encode('ascii', 'replace')
+        line = line.strip()
+        if len(line) != CELL_COUNT:
+            raise SodokuException('A puzzle line needs {} characters, got {}'.format(CELL_COUNT, len(line)))
+        values = line.translate(LINE_TO_VALUES)
+        if max(values) > SIZE:
+            raise SodokuException('Unexpected character in puzzle line: {!r}'.format(line))
+        board = cls.__new__(cls)
+        board.values = bytearray(values)
+        return board
+
+    @classmethod
+    def from_page(cls, page):
+        # A saved puzzle page, as read by parse_response().
+        board = cls.__new__(cls)
+        board.values = parse_values(page)
+        return board
+
+    def to_line(self, blank='.'):
+        return ''.join(str(value) if value else blank for value in self.values)
+
+    def to_board(self, strategy=NoGuessing):
+        return Board(strategy, self.values)
+
+    def copy(self):
+        return CompactBoard(self.values)
+
+    def __copy__(self):
+        return self.copy()
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
+    def __bytes__(self):
+        return bytes(self.values)
+
+    def __eq__(self, other):
+        if not isinstance(other, CompactBoard):
+            return NotImplemented
+        return self.values == other.values
+
+    def __len__(self):
+        return CELL_COUNT
+
+    def __getitem__(self, row):
+        return [CompactCell(self, index) for index in ROW_UNITS[row]]
+
+    def cell(self, row, col):
+        return CompactCell(self, row * SIZE + col)
+
+    @property
+    def cells(self):
+        for index in range(CELL_COUNT):
+            yield CompactCell(self, index)
+
+    @property
+    def is_complete(self):
+        values = self.values
+        for units in (ROW_UNITS, COL_UNITS, BOX_UNITS):
+            for unit in units:
+                used = 0
+                for index in unit:
+                    used |= VALUE_BIT[values[index]]
+                if used != FULL_MASK:
+                    return False
+        return True
+
+    def options_mask(self, index):
+        values = self.values
+        used = 0
+        for peer in PEERS[index]:
+            used |= VALUE_BIT[values[peer]]
+        return FULL_MASK & ~used
+
+    def set_value(self, index, value):
+        if value is None:
+            self.values[index] = 0
+            return
+        if not 1 <= value <= SIZE:
+            raise Exception('Value is not in range 1-9 or None: %d' % value)
+
+        values = self.values
+        for unit, exception in ((ROW_UNITS[ROW_OF[index]], ConstraintExceptionRow),
+                                (COL_UNITS[COL_OF[index]], ConstraintExceptionCol),
+                                (BOX_UNITS[BOX_OF[index]], ConstraintExceptionBox)):
+            if any(values[other] == value for other in unit if other != index):
+                raise exception('Tried to set a value {} on a constrain that all ready exists: {}'.format(
+                    repr(CompactCell(self, index)), [values[other] or None for other in unit]))
+        values[index] = value
+
+    def __str__(self):
+        output = []
+        template = '{} {} {} | {} {} {} | {} {} {}'
+        for row_index, row in enumerate(ROW_UNITS):
+            if row_index % 3 == 0 and output != []:
+                output.append('-' * 21)
+            output.append(template.format(*[self.values[index] or ' ' for index in row]))
+        return '\n'.join(output)
+
+    def __repr__(self):
+        return 'CompactBoard({!r})'.format(bytes(self.values))
+
+
+class CompactCell:
+    __slots__ = ('board', 'index')
+
+    def __init__(self, board, index):
+        self.board = board
+        self.index = index
+
+    @property
+    def row(self):
+        return ROW_OF[self.index]
+
+    @property
+    def col(self):
+        return COL_OF[self.index]
+
+    @property
+    def value(self):
+        return self.board.values[self.index] or None
+
+    @value.setter
+    def value(self, value):
+        self.board.set_value(self.index, value)
+
+    @property
+    def options_mask(self):
+        return self.board.options_mask(self.index) & ~VALUE_BIT[self.board.values[self.index]]
+
+    @property
+    def option_count(self):
+        return MASK_SIZE[self.options_mask]
+
+    @property
+    def remaining_options(self):
+        return set(MASK_VALUES[self.options_mask])
+
+    @property
+    def is_impossible(self):
+        return self.value is None and self.options_mask == 0
+
+    def __eq__(self, other):
+        return (self.value == other.value and
+                self.row == other.row and
+                self.col == other.col
+                )
+
+    def __hash__(self):
+        return hash((self.value, self.col, self.row))
+
+    def __repr__(self):
+        return 'Cell({0.col}, {0.row}, value={0.value})'.format(self)
+
+    def __str__(self):
+        if self.value is None:
+            return ' '
+        return str(self.value)
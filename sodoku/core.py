@@ -1,22 +1,17 @@
-import urllib
 from datetime import datetime
-from urllib import request
-
-import random
-from bs4 import BeautifulSoup
 
 from collections import namedtuple
 
 import numpy as np
 import logging
 import math
+import re
 import copy
+import time
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.WARN)
 
-ALL_VALUES = {1, 2, 3, 4, 5, 6, 7, 8, 9}
-
 
 class SodokuException(Exception):
     pass
@@ -47,6 +42,11 @@ class Strategy():
         self.board = board
         self.history = []
 
+    def solve(self):
+        while not self.board.is_complete:
+            self.solve_one_cell()
+        return self.board, self.history
+
 
 class StrategyException(SodokuException):
     pass
@@ -58,8 +58,8 @@ class NoGuessing(Strategy):
             return
 
         for cell in self.board.cells:
-            if len(cell.remaining_options) == 1 and cell.value is None:
-                cell.value = cell.remaining_options.pop()
+            if cell.value is None and cell.option_count == 1:
+                cell.value = cell.geometry.mask_values[cell.options_mask][0]
                 self.history.append(Position(cell.col, cell.row, cell.value))
                 return
 
@@ -67,45 +67,91 @@ class NoGuessing(Strategy):
 
 
 class Guessing(Strategy):
+    # Depth first search with propagation, see Search.  solve_one_cell()
+    # solves a copy of the board once and then places one cell of that
+    # solution per call, in the order the search found them.  The solution is
+    # worked out again if the board no longer agrees with it.
     def __init__(self, board):
         super().__init__(board)
-        self.no_guessing = NoGuessing
+        self.solution = None
+        self.plan = []
 
-    def solve(self, board=None, history=None):
-        logger.debug('Starting to solve: {}\n{}'.format(repr(board)), history)
-        if history is None:
-            history = []
-        while not board.is_complete:
-            try:
-                no_guessing = self.no_guessing(board)
-                logger.debug('Solving obvious cases')
-                no_guessing.solve_one_cell()
-                history += self.no_guessing.history
-                logger.debug('\t{}'.format(self.history[-1]))
-            except StrategyException:
-                logger.debug('Exhausted obvious cases, guessing\n{}'.format(board))
-                logger.debug('Options remaining:\n{}'.format(board.remaining_string))
-                ranked_options = sorted([c for c in board.cells if c.value is None],
-                                        key=lambda c: len(c.remaining_options))
-
-                for option in ranked_options:
-                    new_board = copy.deepcopy(board)
-                    cell = min(board.cells, key=lambda c: len(c.remaining_options) if c.remaining_options else 10)
-                    cell.value = random.choice(list(cell.remaining_options))
-                    history.append(Position(cell.col, cell.row, cell.value))
-                    logger.debug('Guessing {}'.format(strategy.history[-1]))
-                    strategy.solve()
+    def search(self, board, history=None):
+        search = Search(board, history, displayer=lambda string: None)
+        if not search.run():
+            raise StrategyException('The board has no solution.')
+        return search.history
+
+    def solve(self):
+        self.history = self.search(self.board, self.history)
+        return self.board, self.history
+
+    def solve_one_cell(self):
+        if self.board.is_complete:
+            return
+
+        cells = self.board.cells.flat
+        if self.solution is None or any(cell.value not in (None, value) for cell, value in zip(cells, self.solution)):
+            board = self.board.copy()
+            self.plan = self.search(board)
+            self.solution = [cell.value for cell in board.cells.flat]
+
+        for position in self.plan:
+            cell = cells[position.row * self.board.geometry.size + position.col]
+            if cell.value is None:
+                cell.value = position.value
+                self.history.append(position)
+                return
 
 
 class Constraint:
+    # A group of cells holding distinct values.  used is the mask of values
+    # held, blocked the mask of values the empty cells cannot take.  A unit
+    # has to hold every value once.
+    is_unit = True
+
     def __init__(self, cells):
         self.cells = cells
+        self.geometry = next(iter(cells)).geometry
+        self.counts = [0] * (self.geometry.size + 1)
+        self.used = 0
+        self.blocked = 0
         for cell in self.cells:
             cell.add_constraint(self)
+            if cell.value is not None:
+                self.add_value(cell.value)
 
     @property
     def is_complete(self):
-        return ALL_VALUES == set([c.value for c in self.cells])
+        return self.used == self.geometry.full_mask
+
+    def add_value(self, value):
+        self.counts[value] += 1
+        self.used |= self.geometry.value_bit[value]
+        self.blocked = self.used
+
+    def remove_value(self, value):
+        self.counts[value] -= 1
+        if self.counts[value] == 0:
+            self.used &= ~self.geometry.value_bit[value]
+            self.blocked = self.used
+
+    def copy_to(self, board):
+        return type(self)([board.cells[cell.row][cell.col] for cell in self.cells])
+
+    def copy_state(self, cells):
+        # The same constraint on other cells holding the same values, with
+        # the counts copied instead of added up again.
+        constraint = type(self).__new__(type(self))
+        constraint.cells = cells
+        constraint.geometry = self.geometry
+        constraint.counts = list(self.counts)
+        constraint.used = self.used
+        constraint.blocked = self.blocked
+        for cell in cells:
+            cell.constraints.add(constraint)
+            cell.listeners.append(constraint)
+        return constraint
 
     def __iter__(self):
         return iter(self.cells)
@@ -113,14 +159,21 @@ class Constraint:
     def __contains__(self, item):
         return item in self.cells
 
-    def cell_has_changed(self, cell):
+    def cell_has_changed(self, cell, previous=None):
         if cell not in self:
             raise CellNotInConstaint()
 
+        if previous == cell.value:
+            return
+
+        if previous is not None:
+            self.remove_value(previous)
+
         if cell.value is None:
             return
 
-        if not self.is_value_unique(cell):
+        self.add_value(cell.value)
+        if self.counts[cell.value] > 1:
             msg = 'Tried to set a value {} on a constrain that all ready exists: {}'.format(
                 cell,
                 [other_cell.value for other_cell in self.cells])
@@ -134,7 +187,7 @@ class Constraint:
 
     @property
     def remaining_options(self):
-        return set([1, 2, 3, 4, 5, 6, 7, 8, 9]) - set([c.value for c in self])
+        return set(self.geometry.mask_values[self.geometry.full_mask & ~self.blocked])
 
     def __str__(self):
         return 'Constraint: remaining options: %s - cells %s' % (
@@ -159,17 +212,168 @@ class ColConstraint(Constraint):
 
 
 class Board:
-    def __init__(self, strategy=NoGuessing):
-        self.cells = Cells(9, 9)
+    def __init__(self, strategy=NoGuessing, values=None, size=9):
+        self.geometry = geometry(size)
+        self.cells = Cells(size, size, values, self.geometry)
         self.rows = []
         self.cols = []
         self.boxes = []
+        self.variants = []
         self.setup_constraints()
+        self.setup_layout()
+        self.setup_tracking()
         self.strategy = strategy(self)
 
     @property
     def is_complete(self):
-        return all(constraint.is_complete for constraint in self.all_constraints)
+        return len(self.complete_units) == len(self.units)
+
+    @property
+    def is_dead_end(self):
+        return bool(self.empty_cells or self.stuck_units)
+
+    def setup_layout(self):
+        # The constraints that are units, the cell indexes of each unit, and
+        # the units and peers of every cell.  Without variant constraints
+        # these are the geometry's tables.  Variants with a
+        # propagate(board, trail) method also prune candidates in propagate().
+        g = self.geometry
+        extra_units = [constraint for constraint in self.variants if constraint.is_unit]
+        self.units = self.all_constraints + extra_units
+        self.propagators = [constraint for constraint in self.variants if hasattr(constraint, 'propagate')]
+        if not self.variants:
+            self.unit_cells, self.units_of, self.peers = g.units, g.units_of, g.peers
+            return
+
+        def indexes(constraint):
+            return tuple(cell.row * g.size + cell.col for cell in constraint.cells)
+
+        self.unit_cells = g.units + tuple(indexes(constraint) for constraint in extra_units)
+        units_of = [list(units) for units in g.units_of]
+        for unit in range(len(g.units), len(self.unit_cells)):
+            for index in self.unit_cells[unit]:
+                units_of[index].append(unit)
+        self.units_of = tuple(tuple(units) for units in units_of)
+        peers = [set(cells) for cells in g.peers]
+        for constraint in self.variants:
+            cells = indexes(constraint)
+            for index in cells:
+                peers[index].update(cells)
+        self.peers = tuple(tuple(sorted(cells - {index})) for index, cells in enumerate(peers))
+
+    def add_constraints(self, constraints):
+        # Adds variant constraints (see sodoku.variants) made on this board's
+        # cells.  The board has to hear about a change after every constraint,
+        # so it stops listening until the tracking is set up again.
+        self.variants.extend(constraints)
+        for cell in self.cells.flat:
+            cell.listeners.remove(self)
+        self.setup_layout()
+        self.setup_tracking()
+
+    def setup_tracking(self):
+        # The board listens to its cells after the constraints have seen a
+        # change.  It keeps a count of filled cells, the set of completed units,
+        # the options of every empty cell (0 once filled), how many places each
+        # digit has left in each unit, and the (unit, value) pairs that have run
+        # out of places.  Empty cells are kept in buckets by option count, so
+        # buckets[0] holds the cells with no options left.
+        flat = self.cells.flat
+        g = self.geometry
+        self.filled = sum(1 for cell in flat if cell.value is not None)
+        self.complete_units = set(constraint for constraint in self.units if constraint.is_complete)
+        self.options = [cell.options_mask if cell.value is None else 0 for cell in flat]
+        self.buckets = [set() for _ in range(g.size + 1)]
+        self.bucket_of = [None] * len(flat)
+        for index, cell in enumerate(flat):
+            if cell.value is None:
+                self.bucket_of[index] = g.mask_size[self.options[index]]
+                self.buckets[self.bucket_of[index]].add(index)
+        self.empty_cells = self.buckets[0]
+        self.places = [[0] * (g.size + 1) for _ in self.unit_cells]
+        for index, mask in enumerate(self.options):
+            for unit in self.units_of[index]:
+                for value in g.mask_values[mask]:
+                    self.places[unit][value] += 1
+        self.stuck_units = set()
+        for unit in range(len(self.unit_cells)):
+            for value in g.all_values:
+                self.check_stuck(unit, value)
+        for cell in flat:
+            cell.add_listener(self)
+
+    def cell_has_changed(self, cell, previous=None):
+        g = self.geometry
+        index = cell.row * g.size + cell.col
+        if previous == cell.value:
+            self.update_options(index)
+            return
+
+        if previous is None:
+            self.filled += 1
+        elif cell.value is None:
+            self.filled -= 1
+
+        for unit in self.units_of[index]:
+            constraint = self.units[unit]
+            if constraint.is_complete:
+                self.complete_units.add(constraint)
+            else:
+                self.complete_units.discard(constraint)
+
+        self.update_options(index)
+        for peer in self.peers[index]:
+            self.update_options(peer)
+        for unit in self.units_of[index]:
+            for value in (previous, cell.value):
+                if value is not None:
+                    self.check_stuck(unit, value)
+
+    def update_options(self, index):
+        cell = self.cells.flat[index]
+        g = self.geometry
+        mask = 0
+        bucket = None
+        if cell.value is None:
+            mask = cell.options_mask
+            bucket = g.mask_size[mask]
+        if bucket != self.bucket_of[index]:
+            if self.bucket_of[index] is not None:
+                self.buckets[self.bucket_of[index]].discard(index)
+            if bucket is not None:
+                self.buckets[bucket].add(index)
+            self.bucket_of[index] = bucket
+
+        old = self.options[index]
+        if mask == old:
+            return
+        self.options[index] = mask
+        lost = old & ~mask
+        gained = mask & ~old
+        for unit in self.units_of[index]:
+            places = self.places[unit]
+            for value in g.mask_values[lost]:
+                places[value] -= 1
+                if places[value] == 0:
+                    self.check_stuck(unit, value)
+            for value in g.mask_values[gained]:
+                places[value] += 1
+                if places[value] == 1:
+                    self.stuck_units.discard((unit, value))
+
+    def best_cell(self):
+        # An empty cell with the fewest options, or None when there is none
+        # that still has an option.
+        for bucket in self.buckets[1:]:
+            if bucket:
+                return next(iter(bucket))
+        return None
+
+    def check_stuck(self, unit, value):
+        if self.places[unit][value] == 0 and not self.units[unit].used & self.geometry.value_bit[value]:
+            self.stuck_units.add((unit, value))
+        else:
+            self.stuck_units.discard((unit, value))
 
     @property
     def all_constraints(self):
@@ -183,9 +387,49 @@ class Board:
     def history(self):
         return self.strategy.history
 
+    def copy(self):
+        # Copies the cells and the state of the constraints and of the
+        # tracking rather than working them out again from the values.
+        # Variant constraints are made again with copy_to().
+        board = type(self).__new__(type(self))
+        board.geometry = self.geometry
+        board.cells = self.cells.copy()
+        flat = board.cells.flat
+
+        def cells_of(constraint):
+            return [flat[cell.row * self.geometry.size + cell.col] for cell in constraint.cells]
+
+        board.rows = [constraint.copy_state(cells_of(constraint)) for constraint in self.rows]
+        board.cols = [constraint.copy_state(cells_of(constraint)) for constraint in self.cols]
+        board.boxes = [constraint.copy_state(cells_of(constraint)) for constraint in self.boxes]
+        board.variants = [constraint.copy_to(board) for constraint in self.variants]
+        board.setup_layout()
+
+        board.filled = self.filled
+        board.complete_units = set(board.units[unit] for unit, constraint in enumerate(self.units)
+                                   if constraint in self.complete_units)
+        board.options = list(self.options)
+        board.buckets = [set(bucket) for bucket in self.buckets]
+        board.bucket_of = list(self.bucket_of)
+        board.empty_cells = board.buckets[0]
+        board.places = [list(places) for places in self.places]
+        board.stuck_units = set(self.stuck_units)
+        for cell in flat:
+            cell.listeners.append(board)
+
+        board.strategy = type(self.strategy)(board)
+        board.strategy.history = list(self.strategy.history)
+        return board
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
     def solve_one_cell(self):
         self.strategy.solve_one_cell()
 
+    def solve(self):
+        return self.strategy.solve()
+
     def setup_constraints(self):
         self.setup_rows()
         self.setup_cols()
@@ -207,103 +451,50 @@ class Board:
         return self.cells.size_y
 
     def setup_rows(self):
-        self.rows = []
-        for r in range(self.size_x):
-            self.rows.append(RowConstraint(self.cells[r][:]))
+        self.rows = [RowConstraint([self.cells.flat[index] for index in unit]) for unit in self.geometry.row_units]
 
     def setup_cols(self):
-        self.cols = []
-        for r in range(self.size_y):
-            self.cols.append(ColConstraint([self.cells[c][r] for c in range(9)]))
+        self.cols = [ColConstraint([self.cells.flat[index] for index in unit]) for unit in self.geometry.col_units]
 
     def setup_boxes(self):
-        self.boxes = [
-            BoxConstraint(
-                [
-                    self[0][0], self[1][0], self[2][0],
-                    self[0][1], self[1][1], self[2][1],
-                    self[0][2], self[1][2], self[2][2],
-                ]
-            ),
-            BoxConstraint(
-                [
-                    self[3][0], self[4][0], self[5][0],
-                    self[3][1], self[4][1], self[5][1],
-                    self[3][2], self[4][2], self[5][2],
-                ]
-            ),
-            BoxConstraint(
-                [
-                    self[6][0], self[7][0], self[8][0],
-                    self[6][1], self[7][1], self[8][1],
-                    self[6][2], self[7][2], self[8][2],
-                ]
-            ),
-
-            BoxConstraint(
-                [
-                    self[0][3], self[1][3], self[2][3],
-                    self[0][4], self[1][4], self[2][4],
-                    self[0][5], self[1][5], self[2][5],
-                ]
-            ),
-            BoxConstraint(
-                [
-                    self[3][3], self[4][3], self[5][3],
-                    self[3][4], self[4][4], self[5][4],
-                    self[3][5], self[4][5], self[5][5],
-                ]
-            ),
-            BoxConstraint(
-                [
-                    self[6][3], self[7][3], self[8][3],
-                    self[6][4], self[7][4], self[8][4],
-                    self[6][5], self[7][5], self[8][5],
-                ]
-            ),
-
-            BoxConstraint(
-                [
-                    self[0][6], self[1][6], self[2][6],
-                    self[0][7], self[1][7], self[2][7],
-                    self[0][8], self[1][8], self[2][8],
-                ]
-            ),
-            BoxConstraint(
-                [
-                    self[3][6], self[4][6], self[5][6],
-                    self[3][7], self[4][7], self[5][7],
-                    self[3][8], self[4][8], self[5][8],
-                ]
-            ),
-            BoxConstraint(
-                [
-                    self[6][6], self[7][6], self[8][6],
-                    self[6][7], self[7][7], self[8][7],
-                    self[6][8], self[7][8], self[8][8],
-                ]
-            )
-        ]
+        self.boxes = [BoxConstraint([self.cells.flat[index] for index in unit]) for unit in self.geometry.box_units]
 
     def __str__(self):
         return self.cells_as_str(str)
 
     def cells_as_str(self, func):
         output = []
-        template = '{} {} {} | {} {} {} | {} {} {}'
+        box_size = self.geometry.box_size
+        width = len(str(self.geometry.size))
+        template = ' | '.join([' '.join(['{:>%d}' % width] * box_size)] * box_size)
         for row_index, row in enumerate(self.rows):
-            if row_index % 3 == 0 and output != []:
-                output.append('-' * 21)
-            output.append(template.format(*[func(c) for c in row]))
+            if row_index % box_size == 0 and output != []:
+                output.append('-' * len(output[-1]))
+            output.append(template.format(*[str(func(c)) for c in row]))
         return '\n'.join(output)
 
 
 class Cells:
-    def __init__(self, size_x, size_y):
+    def __init__(self, size_x, size_y, values=None, geometry=None):
         self.size_x = size_x
         self.size_y = size_y
-        self._cells = np.array([[Cell(Position(c, r, None)) for c in range(size_y)]
+        values = [None] * (size_x * size_y) if values is None else [value or None for value in values]
+        if len(values) != size_x * size_y:
+            raise SodokuException('Expected {} cell values, got {}'.format(size_x * size_y, len(values)))
+        self._cells = np.array([[Cell(Position(c, r, values[r * size_y + c]), geometry) for c in range(size_y)]
                                 for r in range(size_x)])
+        self.flat = tuple(self._cells.flat)
+
+    def copy(self):
+        cells = Cells.__new__(Cells)
+        cells.size_x = self.size_x
+        cells.size_y = self.size_y
+        cells._cells = np.empty(self._cells.shape, dtype=object)
+        for row, row_cells in enumerate(self._cells):
+            for col, cell in enumerate(row_cells):
+                cells._cells[row, col] = cell.copy()
+        cells.flat = tuple(cells._cells.flat)
+        return cells
 
     def __len__(self):
         return self.size_x * self.size_y
@@ -318,18 +509,32 @@ class Cells:
 
 
 class Cell:
-    def __init__(self, position):
-        self.listeners = set()
+    def __init__(self, position, geometry=None):
+        self.geometry = STANDARD if geometry is None else geometry
+        self.listeners = []
         self.constraints = set()
+        self._eliminated = 0
         self._value = None
         self.value = position.value
         self.col = position.col
         self.row = position.row
 
+    def copy(self):
+        # The value and eliminations, without constraints or listeners.
+        cell = Cell.__new__(Cell)
+        cell.geometry = self.geometry
+        cell.listeners = []
+        cell.constraints = set()
+        cell._eliminated = self._eliminated
+        cell._value = self._value
+        cell.col = self.col
+        cell.row = self.row
+        return cell
+
     @property
     def is_impossible(self):
-        if self.value is None and len(self.remaining_options) == 0:
-            logger.debug('Cell {0} is impossible to solve. Remaining: {0.remaining_options}'.format(self))
+        if self.value is None and self.options_mask == 0:
+            logger.debug('Cell %s is impossible to solve. Remaining: %s', self, self.remaining_options)
             return True
         else:
             return False
@@ -348,24 +553,45 @@ class Cell:
         self.add_listener(constraint)
 
     def add_listener(self, listener):
-        self.listeners.add(listener)
+        if listener not in self.listeners:
+            self.listeners.append(listener)
 
-    def broadcast_change(self):
+    def broadcast_change(self, previous=None):
+        # Every listener has to see the change, even if an earlier one rejects it,
+        # otherwise their incremental state drifts away from the cell values.
+        error = None
         for listener in self.listeners:
-            listener.cell_has_changed(self)
+            try:
+                listener.cell_has_changed(self, previous)
+            except ConstraintException as e:
+                if error is None:
+                    error = e
+        if error is not None:
+            raise error
 
     @property
     def value(self):
         return self._value
 
+    @property
+    def eliminated(self):
+        return self._eliminated
+
+    @eliminated.setter
+    def eliminated(self, mask):
+        if mask != self._eliminated:
+            self._eliminated = mask
+            self.broadcast_change(self._value)
+
     @value.setter
     def value(self, value):
-        if value is None or (1 <= value <= 9):
+        if value is None or (1 <= value <= self.geometry.size):
+            previous = self._value
             self._value = value
         else:
-            raise Exception('Value is not in range 1-9 or None: %d' % value)
+            raise Exception('Value is not in range 1-%d or None: %d' % (self.geometry.size, value))
 
-        self.broadcast_change()
+        self.broadcast_change(previous)
 
     def __repr__(self):
         return 'Cell({0.col}, {0.row}, value={0.value})'.format(self)
@@ -376,11 +602,19 @@ class Cell:
         return str(self.value)
 
     @property
-    def remaining_options(self):
-        remaining_options = {1, 2, 3, 4, 5, 6, 7, 8, 9}
+    def options_mask(self):
+        used = 0
         for constraint in self.constraints:
-            remaining_options -= ALL_VALUES - constraint.remaining_options
-        return remaining_options
+            used |= constraint.blocked
+        return self.geometry.full_mask & ~(used | self._eliminated)
+
+    @property
+    def option_count(self):
+        return self.geometry.mask_size[self.options_mask]
+
+    @property
+    def remaining_options(self):
+        return set(self.geometry.mask_values[self.options_mask])
 
     @property
     def reasons(self):
@@ -404,21 +638,108 @@ class Cell:
         return [c for c in self.constraints if isinstance(c, BoxConstraint)][0]
 
 
-def box_generator():
-    for r in range(9):
-        for y in range(3):
-            yb = y + (math.floor(r / 3) % 3) * 3
-            for x in range(3):
-                xb = x + ((r % 3) * 3)
+def box_generator(box_size=3):
+    size = box_size * box_size
+    for r in range(size):
+        for y in range(box_size):
+            yb = y + (math.floor(r / box_size) % box_size) * box_size
+            for x in range(box_size):
+                xb = x + ((r % box_size) * box_size)
                 yield (xb, yb)
 
 
+class MaskValues(dict):
+    # Values of a candidate mask, worked out on first use.  Boards up to
+    # 16x16 get a full list instead, 25 bits is too many to tabulate.
+    def __missing__(self, mask):
+        values = tuple(value for value in range(1, mask.bit_length() + 1) if mask >> (value - 1) & 1)
+        self[mask] = values
+        return values
+
+
+class MaskSize(dict):
+    def __missing__(self, mask):
+        size = bin(mask).count('1')
+        self[mask] = size
+        return size
+
+
+class Geometry:
+    # Values, candidate masks and unit and peer tables for boards made of
+    # box_size x box_size boxes, shared by every board of that size.  Cells
+    # are indexed row major: index = row * size + col.  Candidate sets are
+    # masks with bit (value - 1) set when value is possible.
+    def __init__(self, box_size):
+        self.box_size = box_size
+        self.size = size = box_size * box_size
+        self.cell_count = cell_count = size * size
+        self.all_values = set(range(1, size + 1))
+        self.value_bit = [0] + [1 << (value - 1) for value in range(1, size + 1)]
+        self.full_mask = (1 << size) - 1
+        if size <= 16:
+            self.mask_values = [tuple(value for value in range(1, size + 1) if mask & self.value_bit[value])
+                                for mask in range(self.full_mask + 1)]
+            self.mask_size = [len(values) for values in self.mask_values]
+        else:
+            self.mask_values = MaskValues()
+            self.mask_size = MaskSize()
+
+        self.row_units = tuple(tuple(row * size + col for col in range(size)) for row in range(size))
+        self.col_units = tuple(tuple(row * size + col for row in range(size)) for col in range(size))
+        self.box_units = tuple(zip(*[iter(row * size + col for row, col in box_generator(box_size))] * size))
+        self.units = self.row_units + self.col_units + self.box_units
+
+        self.row_of = tuple(index // size for index in range(cell_count))
+        self.col_of = tuple(index % size for index in range(cell_count))
+        box_of = [None] * cell_count
+        for box, unit in enumerate(self.box_units):
+            for index in unit:
+                box_of[index] = box
+        self.box_of = tuple(box_of)
+        self.units_of = tuple((self.row_of[index], size + self.col_of[index], 2 * size + self.box_of[index])
+                              for index in range(cell_count))
+        self.peers = tuple(tuple(sorted(set().union(*(self.units[unit] for unit in self.units_of[index])) - {index}))
+                           for index in range(cell_count))
+
+
+_GEOMETRIES = {}
+
+
+def geometry(size):
+    # The Geometry of a size x size board, size being 4, 9, 16, 25, ...
+    if size not in _GEOMETRIES:
+        box_size = math.isqrt(size)
+        if size < 1 or box_size * box_size != size:
+            raise SodokuException('Board size must be a square number, got {}'.format(size))
+        _GEOMETRIES[size] = Geometry(box_size)
+    return _GEOMETRIES[size]
+
+
+# Tables of the standard 9x9 board.
+STANDARD = geometry(9)
+ALL_VALUES = STANDARD.all_values
+VALUE_BIT = STANDARD.value_bit
+FULL_MASK = STANDARD.full_mask
+MASK_VALUES = STANDARD.mask_values
+MASK_SIZE = STANDARD.mask_size
+CELL_COUNT = STANDARD.cell_count
+ROW_UNITS = STANDARD.row_units
+COL_UNITS = STANDARD.col_units
+BOX_UNITS = STANDARD.box_units
+UNITS = STANDARD.units
+ROW_OF = STANDARD.row_of
+COL_OF = STANDARD.col_of
+BOX_OF = STANDARD.box_of
+UNITS_OF = STANDARD.units_of
+PEERS = STANDARD.peers
+
 Position = namedtuple('Position', ('col', 'row', 'value'))
 
 
 def read_board(string):
-    board = Board()
-    for row, line in enumerate(string.split('\n')):
+    lines = string.split('\n')
+    board = Board(size=len(lines))
+    for row, line in enumerate(lines):
         for col, value in enumerate(line.split(' ')):
             board[row][col].value = None if value == '#' else int(value)
     return board
@@ -447,7 +768,7 @@ class Displayer:
 
 
 def total_options(cell):
-    return len(cell.remaining_options) + len(cell.row_constraint.uncompleted_cells)
+    return cell.option_count + len(cell.row_constraint.uncompleted_cells)
 
 
 def uncompleted(cell):
@@ -455,82 +776,459 @@ def uncompleted(cell):
 
 
 def easy_first(cell):
-    return len(cell.remaining_options)
+    return cell.option_count
 
 
 def hard_first(cell):
-    return 9 - len(cell.remaining_options)
+    return cell.geometry.size - cell.option_count
 
 
-def solve(board, history=None, max_rank_to_try=9, displayer=None):
-    if board.is_complete:
-        return board, []
+# Search heuristics.  A cell order is called with the board and returns the
+# flat index of the empty cell to branch on, or None when no cell has options
+# left.  A value order is called with the board and that index and returns
+# the values to try, in order.  Both read the options the board tracks.
+def minimum_remaining_values(board):
+    return board.best_cell()
 
-    if displayer is None:
-        displayer = Displayer(30)
-    displayer('.')
-    starting_time = None
-    if history is None:
-        logger.info('Starting to solve')
-        starting_time = datetime.now()
-    logger.debug('Starting recursion\n{}\n{}'.format(
-        concat_board_str(str(board), board.remaining_string),
-        history))
-    if history is None:
-        history = []
-    ranked_cells = sorted([c for c in board.cells if c.value is None],
-                          key=easy_first)
-
-    logger.debug('Ranked Cells: {}'.format(ranked_cells))
-    for ranked_cell in [c for c in ranked_cells if len(c.remaining_options) <= max_rank_to_try]:
-        for option in ranked_cell.remaining_options:
-            logger.debug('Trying {} in [{cell.col}][{cell.row}]={cell.value}'.format(option, cell=ranked_cell))
-            new_board = copy.deepcopy(board)
-            new_move = Position(ranked_cell.col, ranked_cell.row, option)
-            new_history = history + [new_move]
-            new_board[new_move.row][new_move.col].value = new_move.value
-            logger.debug('Move seems reasonable\n{}'.format(
-                concat_board_str(str(new_board), new_board.remaining_string)))
-            if new_board.is_complete:
-                logger.info('Found a solution, returning')
-                return (new_board, new_history)
-            elif any(c.is_impossible for c in new_board.cells):
-                logger.debug('No solution is possible, trying next possibility')
+
+def cell_key_order(key):
+    # Adapts a ranking function on cells (easy_first, hard_first, ...) to a
+    # cell order.  It looks at every empty cell on every node, and says how
+    # many through cells_scored for SolveStats.candidate_evaluations.
+    def select_cell(board):
+        flat = board.cells.flat
+        indexes = [index for bucket in board.buckets[1:] for index in bucket]
+        if not indexes:
+            return None
+        return min(indexes, key=lambda index: (key(flat[index]), index))
+    select_cell.__name__ = key.__name__
+    select_cell.cells_scored = lambda board: sum(len(bucket) for bucket in board.buckets[1:])
+    return select_cell
+
+
+def ascending_values(board, index):
+    return board.geometry.mask_values[board.options[index]]
+
+
+def least_constraining_value(board, index):
+    # Try first the values that take the fewest places away from the other
+    # cells in the row, column and box.
+    places = board.places
+    units = board.units_of[index]
+    return sorted(board.geometry.mask_values[board.options[index]],
+                  key=lambda value: sum(places[unit][value] for unit in units))
+
+
+class Heuristic:
+    def __init__(self, select_cell=minimum_remaining_values, order_values=ascending_values):
+        self.select_cell = select_cell
+        self.order_values = order_values
+
+    def cells_scored(self, board):
+        # Cells the cell order looks at to pick one; a bucket lookup like
+        # minimum_remaining_values only looks at the one it returns.
+        cells_scored = getattr(self.select_cell, 'cells_scored', None)
+        return 1 if cells_scored is None else cells_scored(board)
+
+    def __repr__(self):
+        return 'Heuristic({}, {})'.format(self.select_cell.__name__, self.order_values.__name__)
+
+
+CELL_ORDERS = {
+    'mrv': minimum_remaining_values,
+    'easy-first': cell_key_order(easy_first),
+    'hard-first': cell_key_order(hard_first),
+    'total-options': cell_key_order(total_options),
+    'uncompleted': cell_key_order(uncompleted),
+}
+
+VALUE_ORDERS = {
+    'ascending': ascending_values,
+    'lcv': least_constraining_value,
+}
+
+DEFAULT_HEURISTIC = Heuristic()
+
+
+class Trail:
+    def __init__(self):
+        self.entries = []
+
+    def __len__(self):
+        return len(self.entries)
+
+    def assign(self, cell, value):
+        self.entries.append((cell, cell.value, cell.eliminated))
+        cell.value = value
+
+    def eliminate(self, cell, mask):
+        self.entries.append((cell, cell.value, cell.eliminated))
+        cell.eliminated |= mask
+
+    def undo(self, mark=0):
+        while len(self.entries) > mark:
+            cell, value, eliminated = self.entries.pop()
+            if cell.value != value:
+                cell.value = value
+            cell.eliminated = eliminated
+
+
+def propagate(board, trail=None, history=None):
+    if trail is None:
+        trail = Trail()
+    while True:
+        if board.is_dead_end:
+            return False
+        progress = _naked_singles(board, trail, history)
+        if progress is None:
+            return False
+        hidden = _hidden_singles(board, trail, history)
+        if hidden is None:
+            return False
+        pruned = _variant_pruning(board, trail)
+        if pruned is None:
+            return False
+        if progress or hidden or pruned:
+            continue
+        if not _locked_candidates(board, trail):
+            return True
+
+
+def _place(cell, value, trail, history):
+    trail.assign(cell, value)
+    if history is not None:
+        history.append(Position(cell.col, cell.row, value))
+
+
+def _naked_singles(board, trail, history):
+    progress = False
+    flat, options, g = board.cells.flat, board.options, board.geometry
+    for index in range(g.cell_count):
+        mask = options[index]
+        if g.mask_size[mask] == 1:
+            _place(flat[index], g.mask_values[mask][0], trail, history)
+            if board.is_dead_end:
+                return None
+            progress = True
+    return progress
+
+
+def _hidden_singles(board, trail, history):
+    progress = False
+    flat, options, places, units, g = board.cells.flat, board.options, board.places, board.units, board.geometry
+    for unit_index, unit in enumerate(board.unit_cells):
+        for value in g.all_values:
+            if places[unit_index][value] != 1 or units[unit_index].used & g.value_bit[value]:
+                continue
+            bit = g.value_bit[value]
+            index = next(index for index in unit if options[index] & bit)
+            _place(flat[index], value, trail, history)
+            if board.is_dead_end:
+                return None
+            progress = True
+    return progress
+
+
+def _variant_pruning(board, trail):
+    # Each variant's propagate() returns None on a contradiction, otherwise
+    # whether it eliminated anything.
+    progress = False
+    for constraint in board.propagators:
+        pruned = constraint.propagate(board, trail)
+        if pruned is None:
+            return None
+        if board.is_dead_end:
+            return None
+        progress = progress or pruned
+    return progress
+
+
+def _locked_candidates(board, trail):
+    # A digit whose places in one unit all lie in a second unit cannot go
+    # anywhere else in that second unit (pointing pairs and box/line claims).
+    flat, g = board.cells.flat, board.geometry
+    box_of, row_of, col_of = g.box_of, g.row_of, g.col_of
+    masks = list(board.options)
+    progress = False
+    for unit_index, unit in enumerate(g.units):
+        for value in g.all_values:
+            bit = g.value_bit[value]
+            places = [index for index in unit if masks[index] & bit]
+            if len(places) < 2:
                 continue
+            if unit_index < 2 * g.size:
+                targets = [g.box_units[box_of[places[0]]]] if len(set(box_of[i] for i in places)) == 1 else []
             else:
-                logger.debug('Move looks reasonable, going deeper.')
-                try:
-                    solved_board, solution = solve(new_board, new_history, displayer=displayer)
-                except StrategyException:
-                    # displayer('/')
-                    continue
-                if solved_board.is_complete:
-                    logger.debug('Going deeper found a solution, passing it back up.')
-                    if starting_time is not None:
-                        logger.info('Competled solution in {}'.format(datetime.now() - starting_time))
-                    displayer('\b')
-                    return solved_board, solution
-    displayer('\b')
+                targets = []
+                if len(set(row_of[i] for i in places)) == 1:
+                    targets.append(g.row_units[row_of[places[0]]])
+                if len(set(col_of[i] for i in places)) == 1:
+                    targets.append(g.col_units[col_of[places[0]]])
+            for target in targets:
+                for index in target:
+                    if index not in unit and masks[index] & bit:
+                        trail.eliminate(flat[index], bit)
+                        masks[index] &= ~bit
+                        progress = True
+    return progress
 
-    raise StrategyException('Ran out of ideas.')
 
+TraceEvent = namedtuple('TraceEvent', ('kind', 'depth', 'position'))
 
-def download_board(address):
-    response = request.urlopen(address)
-    board = parse_response(response.read())
-    return board
 
+def solve(board, history=None, max_rank_to_try=None, displayer=None, in_place=False, propagation=True,
+          tracer=None, stats=None, on_stats=None, heuristic=None):
+    if board.is_complete:
+        return board, []
+
+    logger.info('Starting to solve')
+    starting_time = datetime.now()
+    if not in_place:
+        board = copy.deepcopy(board)
+
+    search = Search(board, history, max_rank_to_try, displayer, propagation, tracer, stats, heuristic)
+    solved = search.run()
+    if on_stats is not None:
+        on_stats(search.stats)
+    if not solved:
+        raise StrategyException('Ran out of ideas.')
+
+    logger.info('Competled solution in %s', datetime.now() - starting_time)
+    return board, search.history
+
+
+def solve_with_stats(board, **kwargs):
+    stats = kwargs.pop('stats', None) or SolveStats()
+    solved_board, history = solve(board, stats=stats, **kwargs)
+    return solved_board, history, stats
+
+
+class SolveStats:
+    def __init__(self):
+        self.nodes = 0
+        self.guesses = 0
+        self.backtracks = 0
+        self.dead_ends = 0
+        self.max_depth = 0
+        self.candidate_evaluations = 0
+        self.propagations = 0
+        self.propagated_cells = 0
+        self.propagation_time = 0.0
+        self.elapsed = 0.0
+
+    @property
+    def branching_time(self):
+        return self.elapsed - self.propagation_time
+
+    def as_dict(self):
+        stats = dict(vars(self))
+        stats['branching_time'] = self.branching_time
+        return stats
+
+    def __repr__(self):
+        return 'SolveStats({})'.format(', '.join('{}={!r}'.format(k, v) for k, v in sorted(self.as_dict().items())))
+
+
+class Search:
+    # Depth first search on a single board.  Assignments are recorded on a
+    # Trail and undone when a branch fails.  tracer, when given, is called
+    # with a TraceEvent for every guess, dead end, backtrack and solution.
+    # heuristic picks the cell to branch on and the order of its values.
+    def __init__(self, board, history=None, max_rank_to_try=None, displayer=None, propagation=True, tracer=None,
+                 stats=None, heuristic=None):
+        self.board = board
+        self.history = list(history) if history else []
+        self.max_rank_to_try = max_rank_to_try
+        self.displayer = Displayer(30) if displayer is None else displayer
+        self.propagation = propagation
+        self.tracer = tracer
+        self.stats = SolveStats() if stats is None else stats
+        self.heuristic = DEFAULT_HEURISTIC if heuristic is None else heuristic
+        self.trail = Trail()
+        self.debug = logger.isEnabledFor(logging.DEBUG)
+
+    def trace(self, kind, depth, position=None):
+        if self.tracer is not None:
+            self.tracer(TraceEvent(kind, depth, position))
+
+    def propagate(self):
+        stats = self.stats
+        started = time.perf_counter()
+        history_mark = len(self.history)
+        consistent = propagate(self.board, self.trail, self.history)
+        stats.propagations += 1
+        stats.propagated_cells += len(self.history) - history_mark
+        stats.propagation_time += time.perf_counter() - started
+        return consistent
+
+    def run(self):
+        started = time.perf_counter()
+        try:
+            return self._run()
+        finally:
+            self.stats.elapsed += time.perf_counter() - started
+
+    def _run(self):
+        if self.propagation and not self.propagate():
+            self.stats.dead_ends += 1
+            self.trace('dead-end', 0)
+            self.trail.undo()
+            return False
+        if not self.board.is_complete and not self.branch():
+            self.trail.undo()
+            return False
+
+        for cell in self.board.cells.flat:
+            cell.eliminated = 0
+        self.trace('solution', 0)
+        return True
+
+    def expand(self, depth):
+        # Opens a search node: picks the cell to branch on and returns the
+        # stack frame for it, or None when there is nothing left to try.
+        board, stats = self.board, self.stats
+        stats.nodes += 1
+        stats.max_depth = max(stats.max_depth, depth)
+        self.displayer('.')
+        if self.debug:
+            logger.debug('Starting node\n%s\n%s', concat_board_str(str(board), board.remaining_string), self.history)
+        stats.candidate_evaluations += self.heuristic.cells_scored(board)
+        index = self.heuristic.select_cell(board)
+        if index is None or self.max_rank_to_try is not None and board.bucket_of[index] > self.max_rank_to_try:
+            self.displayer('\b')
+            return None
+
+        cell = board.cells.flat[index]
+        if self.debug:
+            logger.debug('Branching on %s', cell)
+        values = iter(list(self.heuristic.order_values(board, index)))
+        return [depth, cell, values, len(self.trail), len(self.history), None]
+
+    def branch(self):
+        # Iterative depth first search.  Each frame on the stack holds the
+        # depth, the cell branched on, the values still to try there, the
+        # trail and history marks to undo to and the position being tried.
+        board, trail, history, displayer, stats = self.board, self.trail, self.history, self.displayer, self.stats
+        frame = self.expand(1)
+        stack = [frame] if frame is not None else []
+        while stack:
+            frame = stack[-1]
+            depth, cell, values, mark, history_mark, position = frame
+            if position is not None:
+                trail.undo(mark)
+                del history[history_mark:]
+                stats.backtracks += 1
+                self.trace('backtrack', depth, position)
+
+            option = next(values, None)
+            if option is None:
+                stack.pop()
+                displayer('\b')
+                continue
+
+            if self.debug:
+                logger.debug('Trying %s in [%s][%s]=%s', option, cell.col, cell.row, cell.value)
+            position = frame[5] = Position(cell.col, cell.row, option)
+            trail.assign(cell, option)
+            history.append(position)
+            stats.guesses += 1
+            self.trace('guess', depth, position)
+            if self.debug:
+                logger.debug('Move seems reasonable\n%s', concat_board_str(str(board), board.remaining_string))
+            if board.is_dead_end:
+                logger.debug('No solution is possible, trying next possibility')
+                stats.dead_ends += 1
+                self.trace('dead-end', depth, position)
+            elif self.propagation and not self.propagate():
+                logger.debug('Propagation found a contradiction, trying next possibility')
+                stats.dead_ends += 1
+                self.trace('dead-end', depth, position)
+            elif board.is_complete:
+                logger.info('Found a solution, returning')
+                for _ in stack[1:]:
+                    displayer('\b')
+                return True
+            else:
+                logger.debug('Move looks reasonable, going deeper.')
+                frame = self.expand(depth + 1)
+                if frame is not None:
+                    stack.append(frame)
+
+        return False
+
+
+def download_board(address, timeout=10, retries=3):
+    # One page through sodoku.fetch; use fetch_boards() for many.
+    from .fetch import download_boards
+    result = download_boards([address], timeout=timeout, retries=retries)[0]
+    if result.error is not None:
+        raise result.error
+    return result.board
+
+
+# The puzzle inputs of a saved page, f{a}{b} for board[a][b], matched on
+# the raw bytes in one pass: each <input> tag outside comments is split into
+# attributes.  Inputs without a value are blanks.  Unless every cell's input
+# is seen exactly once with a plain digit, the page goes through
+# BeautifulSoup instead, which raises SodokuException for a page without
+# the puzzle or with a value that is not a digit 1-9.
+HTML_COMMENT = re.compile(rb'<!--.*?(?:-->|$)', re.DOTALL)
+INPUT_TAG = re.compile(rb'<input\b((?:[^>"\']+|"[^"]*"|\'[^\']*\')*)>', re.IGNORECASE)
+INPUT_ATTRIBUTE = re.compile(rb'([^\s"\'<>/=]+)(?:\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s"\'>]*)))?')
+INPUT_ID = re.compile(rb'f([0-8])([0-8])')
+INPUT_DIGITS = b'123456789'
+
+
+def parse_values(response):
+    # The 81 values of a page, row major with 0 for a blank.
+    if isinstance(response, str):
+        response = response.encode('utf-8')
+    page = HTML_COMMENT.sub(b'', response) if b'<!--' in response else response
+    values = bytearray(CELL_COUNT)
+    seen = bytearray(CELL_COUNT)
+    for tag in INPUT_TAG.findall(page):
+        attributes = {name.lower(): double or single or bare
+                      for name, double, single, bare in INPUT_ATTRIBUTE.findall(tag)}
+        cell_id = INPUT_ID.fullmatch(attributes.get(b'id', b''))
+        if cell_id is None:
+            continue
+        index = int(cell_id.group(1)) * 9 + int(cell_id.group(2))
+        if seen[index]:
+            return _parse_values_soup(response)
+        seen[index] = 1
+        value = attributes.get(b'value')
+        if not value:
+            continue
+        if len(value) != 1 or value not in INPUT_DIGITS:
+            return _parse_values_soup(response)
+        values[index] = value[0] - 48
+    if seen.count(1) != CELL_COUNT:
+        return _parse_values_soup(response)
+    return values
+
+
+def _parse_values_soup(response):
+    # Slow path for markup the patterns do not cover.
+    from bs4 import BeautifulSoup
 
-def parse_response(response):
     soup = BeautifulSoup(response, 'html.parser')
-    board = Board()
+    values = bytearray(CELL_COUNT)
     for col in range(9):
         for row in range(9):
-            c = soup.find(id='f{}{}'.format(col, row))
-            try:
-                board[col][row].value = int(c['value'])
-            except KeyError:
-                pass
-    return board
+            name = 'f{}{}'.format(col, row)
+            c = soup.find(id=name)
+            if c is None:
+                raise SodokuException('The page has no puzzle input {}'.format(name))
+            value = c.get('value', '').strip()
+            if not value:
+                continue
+            if len(value) != 1 or value not in '123456789':
+                raise SodokuException('Unexpected value {!r} in puzzle input {}'.format(value, name))
+            values[col * 9 + row] = int(value)
+    return values
+
+
+def parse_response(response):
+    return Board(values=parse_values(response))
 
 
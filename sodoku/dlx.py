@@ -0,0 +1,250 @@
+import copy
+from itertools import islice
+
+from .core import Strategy, StrategyException, SodokuException, Position
+from .core import CELL_COUNT, ROW_OF, COL_OF, BOX_OF
+from .compact import CompactBoard
+
+# Exact cover columns: one per cell, then one per (row, digit), (col, digit)
+# and (box, digit).  Each candidate placement covers exactly four of them.
+COLUMN_COUNT = 4 * CELL_COUNT
+
+
+def candidate_columns(index, value):
+    digit = value - 1
+    return (index,
+            CELL_COUNT + ROW_OF[index] * 9 + digit,
+            2 * CELL_COUNT + COL_OF[index] * 9 + digit,
+            3 * CELL_COUNT + BOX_OF[index] * 9 + digit)
+
+
+class DancingLinks:
+    # Knuth's Algorithm X over a toroidal doubly linked list held in flat
+    # lists.  Node 0 is the root, nodes 1..column_count are the column
+    # headers and every row adds one node per column it covers.
+    def __init__(self, column_count):
+        self.column_count = column_count
+        headers = column_count + 1
+        self.left = [headers - 1] + list(range(headers - 1))
+        self.right = list(range(1, headers)) + [0]
+        self.up = list(range(headers))
+        self.down = list(range(headers))
+        self.column = list(range(headers))
+        self.row_of = [None] * headers
+        self.sizes = [0] * headers
+
+    def add_row(self, row, columns):
+        first = None
+        for column in columns:
+            node = len(self.column)
+            header = column + 1
+            self.column.append(header)
+            self.row_of.append(row)
+            self.up.append(self.up[header])
+            self.down.append(header)
+            self.down[self.up[header]] = node
+            self.up[header] = node
+            self.sizes[header] += 1
+            if first is None:
+                first = node
+                self.left.append(node)
+                self.right.append(node)
+            else:
+                self.left.append(self.left[first])
+                self.right.append(first)
+                self.right[self.left[first]] = node
+                self.left[first] = node
+
+    def copy(self):
+        return copy.copy(self)
+
+    def __copy__(self):
+        other = DancingLinks.__new__(DancingLinks)
+        other.column_count = self.column_count
+        other.left = self.left[:]
+        other.right = self.right[:]
+        other.up = self.up[:]
+        other.down = self.down[:]
+        other.column = self.column
+        other.row_of = self.row_of
+        other.sizes = self.sizes[:]
+        return other
+
+    def cover(self, header):
+        left, right, up, down, column, sizes = self.left, self.right, self.up, self.down, self.column, self.sizes
+        right[left[header]] = right[header]
+        left[right[header]] = left[header]
+        node = down[header]
+        while node != header:
+            other = right[node]
+            while other != node:
+                down[up[other]] = down[other]
+                up[down[other]] = up[other]
+                sizes[column[other]] -= 1
+                other = right[other]
+            node = down[node]
+
+    def uncover(self, header):
+        left, right, up, down, column, sizes = self.left, self.right, self.up, self.down, self.column, self.sizes
+        node = up[header]
+        while node != header:
+            other = left[node]
+            while other != node:
+                sizes[column[other]] += 1
+                down[up[other]] = other
+                up[down[other]] = other
+                other = left[other]
+            node = up[node]
+        right[left[header]] = header
+        left[right[header]] = header
+
+    def select(self, row_node):
+        node = row_node
+        while True:
+            self.cover(self.column[node])
+            node = self.right[node]
+            if node == row_node:
+                return
+
+    def solutions(self):
+        right, down, sizes, column = self.right, self.down, self.sizes, self.column
+        chosen = []
+
+        def search():
+            if right[0] == 0:
+                yield [self.row_of[node] for node in chosen]
+                return
+            header = right[0]
+            best = header
+            while header != 0:
+                if sizes[header] < sizes[best]:
+                    best = header
+                    if sizes[best] < 2:
+                        break
+                header = right[header]
+            if sizes[best] == 0:
+                return
+
+            self.cover(best)
+            node = down[best]
+            while node != best:
+                chosen.append(node)
+                other = right[node]
+                while other != node:
+                    self.cover(column[other])
+                    other = right[other]
+                yield from search()
+                other = self.left[node]
+                while other != node:
+                    self.uncover(column[other])
+                    other = self.left[other]
+                chosen.pop()
+                node = down[node]
+            self.uncover(best)
+
+        return search()
+
+
+def _build_template():
+    links = DancingLinks(COLUMN_COUNT)
+    first_nodes = {}
+    for index in range(CELL_COUNT):
+        for value in range(1, 10):
+            first_nodes[index, value] = len(links.column)
+            links.add_row((index, value), candidate_columns(index, value))
+    return links, first_nodes
+
+
+_TEMPLATE, _FIRST_NODES = _build_template()
+
+
+def exact_cover(values):
+    # values: 81 cell values, row major, with None or 0 for a blank cell.
+    links = _TEMPLATE.copy()
+    for index, value in enumerate(values):
+        if value:
+            node = _FIRST_NODES[index, value]
+            if any(links.right[links.left[links.column[other]]] != links.column[other]
+                   for other in (node, node + 1, node + 2, node + 3)):
+                return None
+            links.select(node)
+    return links
+
+
+def exact_cover_solutions(values):
+    links = exact_cover(values)
+    if links is None:
+        return iter(())
+    return links.solutions()
+
+
+def board_values(board):
+    # The cover only knows the rows, columns and boxes of a 9x9 board, so
+    # other boards are refused before any cell is touched.
+    if isinstance(board, CompactBoard):
+        return board.values
+    if board.geometry.size != 9:
+        raise SodokuException('The exact cover solver only supports 9x9 boards, got {0}x{0}'.format(
+            board.geometry.size))
+    if board.variants:
+        raise SodokuException('The exact cover solver does not support variant constraints')
+    return [cell.value or 0 for cell in board.cells]
+
+
+def iter_solutions(board):
+    # Every solution of a Board or CompactBoard as a CompactBoard.  The search
+    # runs on the links alone, a board is only made for each solution found.
+    values = board_values(board)
+    for solution in exact_cover_solutions(values):
+        solved = CompactBoard(values)
+        for index, value in solution:
+            solved.values[index] = value
+        yield solved
+
+
+def count_solutions(board, limit=2):
+    # Stops as soon as limit solutions are found, None counts them all.
+    solutions = exact_cover_solutions(board_values(board))
+    return sum(1 for _ in islice(solutions, limit))
+
+
+def has_unique_solution(board):
+    return count_solutions(board, 2) == 1
+
+
+def solve_exact_cover(board, history=None, in_place=False):
+    values = board_values(board)
+    if not in_place:
+        board = board.copy()
+    cells = board.cells.flat
+    solution = next(exact_cover_solutions(values), None)
+    if solution is None:
+        raise StrategyException('The board has no solution.')
+
+    history = list(history) if history else []
+    for index, value in sorted(solution):
+        cell = cells[index]
+        cell.value = value
+        history.append(Position(cell.col, cell.row, value))
+    return board, history
+
+
+class ExactCover(Strategy):
+    def solve(self):
+        board, history = solve_exact_cover(self.board, in_place=True)
+        self.history += history
+        return board, self.history
+
+    def solve_one_cell(self):
+        if self.board.is_complete:
+            return
+
+        values = board_values(self.board)
+        cells = self.board.cells.flat
+        solution = next(exact_cover_solutions(values), None)
+        if solution is None:
+            raise StrategyException('The board has no solution.')
+        index, value = min(solution)
+        cell = cells[index]
+        cell.value = value
+        self.history.append(Position(cell.col, cell.row, value))
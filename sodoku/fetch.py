@@ -0,0 +1,196 @@
+import asyncio
+from collections import namedtuple
+from urllib.parse import urlsplit
+
+from .core import SodokuException, parse_response
+
+# Downloads many puzzle pages at once: at most `concurrency` requests in
+# flight, HTTP/1.1 keep-alive connections reused per host, a timeout per
+# attempt and retries with backoff on connection errors and 5xx answers.
+# Parsed boards are put on an asyncio.Queue as FetchResults, e.g.
+#
+#     queue = asyncio.Queue()
+#     task = asyncio.create_task(fetch_boards(addresses, queue))
+#     while True:
+#         result = await queue.get()
+#         if result is None:
+#             break
+#         solve(result.board)
+#
+# Only plain http and https GETs are spoken, enough for the puzzle sites.
+
+FetchResult = namedtuple('FetchResult', ('index', 'address', 'board', 'error'))
+
+
+class FetchException(SodokuException):
+    pass
+
+
+class _RetryableStatus(FetchException):
+    pass
+
+
+class Fetcher:
+    def __init__(self, concurrency=8, timeout=10, retries=3, backoff=0.5, user_agent='sodoku'):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.user_agent = user_agent
+        self.idle = {}
+        self.connections_opened = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        for connections in self.idle.values():
+            for _, writer in connections:
+                writer.close()
+        self.idle = {}
+
+    async def _connect(self, key, reuse=True):
+        # A connection and whether it is an idle one reused.
+        connections = self.idle.get(key) if reuse else None
+        while connections:
+            reader, writer = connections.pop()
+            if not reader.at_eof() and not writer.is_closing():
+                return reader, writer, True
+            writer.close()
+        scheme, host, port = key
+        self.connections_opened += 1
+        reader, writer = await asyncio.open_connection(host, port, ssl=scheme == 'https')
+        return reader, writer, False
+
+    async def _request(self, key, target, host):
+        request = 'GET {} HTTP/1.1\r\nHost: {}\r\nUser-Agent: {}\r\nConnection: keep-alive\r\n\r\n'.format(
+            target, host, self.user_agent).encode('latin-1')
+        reader, writer, reused = await self._connect(key)
+        while True:
+            try:
+                writer.write(request)
+                await writer.drain()
+                status, keep_alive, body = await _read_response(reader)
+                break
+            except (OSError, asyncio.IncompleteReadError):
+                writer.close()
+                if not reused:
+                    raise
+                # The server closed an idle connection: try again straight
+                # away on a new one, without using up an attempt.
+                reader, writer, reused = await self._connect(key, reuse=False)
+            except BaseException:
+                writer.close()
+                raise
+        if keep_alive:
+            self.idle.setdefault(key, []).append((reader, writer))
+        else:
+            writer.close()
+        return status, body
+
+    async def fetch(self, address):
+        # The body of a page, retrying failed attempts.
+        parts = urlsplit(address)
+        if parts.scheme not in ('http', 'https'):
+            raise FetchException('Cannot fetch {}'.format(address))
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        key = parts.scheme, parts.hostname, port
+        target = parts.path or '/'
+        if parts.query:
+            target += '?' + parts.query
+
+        # The semaphore is taken per attempt so a page backing off between
+        # attempts does not hold a slot other pages could use.
+        for attempt in range(self.retries + 1):
+            try:
+                async with self.semaphore:
+                    status, body = await asyncio.wait_for(self._request(key, target, parts.netloc), self.timeout)
+                if status >= 500:
+                    raise _RetryableStatus('{} answered {}'.format(address, status))
+                if status != 200:
+                    raise FetchException('{} answered {}'.format(address, status))
+                return body
+            except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, _RetryableStatus) as e:
+                if attempt == self.retries:
+                    raise FetchException('Failed to fetch {}: {!r}'.format(address, e)) from e
+            await asyncio.sleep(self.backoff * 2 ** attempt)
+
+    async def fetch_board(self, address):
+        return parse_response(await self.fetch(address))
+
+
+async def _read_response(reader):
+    # Status, whether the connection can be reused, and body.
+    status_line = await reader.readline()
+    if not status_line:
+        raise asyncio.IncompleteReadError(status_line, None)
+    version, status = status_line.split(None, 2)[:2]
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip().lower()
+
+    keep_alive = version == b'HTTP/1.1' and headers.get('connection') != 'close'
+    if headers.get('transfer-encoding') == 'chunked':
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            if size == 0:
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+        body = b''.join(chunks)
+    elif 'content-length' in headers:
+        body = await reader.readexactly(int(headers['content-length']))
+    else:
+        body = await reader.read()
+        keep_alive = False
+    return int(status), keep_alive, body
+
+
+async def fetch_boards(addresses, queue, fetcher=None, **kwargs):
+    # Puts a FetchResult on queue as each page arrives, error set instead of
+    # board when it could not be fetched or parsed, then None.
+    own_fetcher = fetcher is None
+    if own_fetcher:
+        fetcher = Fetcher(**kwargs)
+
+    async def one(index, address):
+        try:
+            board = await fetcher.fetch_board(address)
+        except Exception as e:
+            await queue.put(FetchResult(index, address, None, e))
+        else:
+            await queue.put(FetchResult(index, address, board, None))
+
+    try:
+        await asyncio.gather(*(one(index, address) for index, address in enumerate(addresses)))
+    finally:
+        if own_fetcher:
+            await fetcher.close()
+        await queue.put(None)
+
+
+def download_boards(addresses, **kwargs):
+    # Blocking helper: the FetchResults of all addresses in order.
+    async def collect():
+        queue = asyncio.Queue()
+        task = asyncio.ensure_future(fetch_boards(addresses, queue, **kwargs))
+        results = []
+        while True:
+            result = await queue.get()
+            if result is None:
+                break
+            results.append(result)
+        await task
+        return sorted(results, key=lambda result: result.index)
+
+    return asyncio.run(collect())
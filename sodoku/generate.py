@@ -0,0 +1,115 @@
+import multiprocessing
+import random
+
+from .core import Board, NoGuessing, SodokuException, CELL_COUNT, BOX_UNITS, MASK_VALUES, MASK_SIZE, propagate
+from .compact import CompactBoard
+from .dlx import exact_cover_solutions, count_solutions
+
+# Difficulty grades, easiest first: naked singles alone solve an easy
+# puzzle, a medium one also needs hidden singles or locked candidates and a
+# hard one needs guessing.
+DIFFICULTIES = ('easy', 'medium', 'hard')
+
+# Fewer clues than this never give a unique solution.
+MIN_CLUES = 17
+
+
+def random_grid(rng=random):
+    # The three boxes on the diagonal share no row or column, so they can be
+    # filled with independent permutations before the exact cover solver
+    # completes the grid.
+    values = bytearray(CELL_COUNT)
+    for box in (0, 4, 8):
+        digits = rng.sample(range(1, 10), 9)
+        for index, value in zip(BOX_UNITS[box], digits):
+            values[index] = value
+    for index, value in next(exact_cover_solutions(values)):
+        values[index] = value
+    return CompactBoard(values)
+
+
+def grade(board):
+    if isinstance(board, CompactBoard):
+        board = board.to_board()
+    else:
+        board = Board(NoGuessing, [cell.value for cell in board.cells.flat])
+
+    singles = board.buckets[1]
+    while singles and not board.is_dead_end:
+        index = next(iter(singles))
+        board.cells.flat[index].value = MASK_VALUES[board.options[index]][0]
+    if board.is_complete:
+        return 'easy'
+    if propagate(board) and board.is_complete:
+        return 'medium'
+    return 'hard'
+
+
+def make_puzzle(grid, clues=None, difficulty=None, rng=random):
+    # Removes clues from a full grid in random order, keeping each removal
+    # only while the puzzle stays unique and no harder than difficulty.
+    # Stops at clues clues, or when no clue can be removed.  A clue its
+    # peers already force is a naked single: taking it out changes neither
+    # the solution count nor the grade, so those skip the checks.
+    limit = DIFFICULTIES.index(difficulty) if difficulty is not None else None
+    puzzle = grid.copy()
+    values = puzzle.values
+    remaining = CELL_COUNT
+    for index in rng.sample(range(CELL_COUNT), CELL_COUNT):
+        if clues is not None and remaining <= clues:
+            break
+        value = values[index]
+        values[index] = 0
+        if MASK_SIZE[puzzle.options_mask(index)] == 1:
+            remaining -= 1
+        elif count_solutions(puzzle, 2) == 1 and (
+                limit is None or DIFFICULTIES.index(grade(puzzle)) <= limit):
+            remaining -= 1
+        else:
+            values[index] = value
+    return puzzle
+
+
+def generate(clues=None, difficulty=None, rng=random, attempts=100):
+    # A random puzzle with a unique solution.  With clues it has exactly
+    # that many clues, with difficulty exactly that grade; grids that miss
+    # are thrown away, up to attempts of them.
+    if clues is not None and not MIN_CLUES <= clues <= CELL_COUNT:
+        raise SodokuException('Clue count must be between {} and {}, got {}'.format(MIN_CLUES, CELL_COUNT, clues))
+    if difficulty is not None and difficulty not in DIFFICULTIES:
+        raise SodokuException('Unknown difficulty {!r}, expected one of {}'.format(difficulty, DIFFICULTIES))
+
+    for _ in range(attempts):
+        puzzle = make_puzzle(random_grid(rng), clues, difficulty, rng)
+        if clues is not None and sum(1 for value in puzzle.values if value) != clues:
+            continue
+        if difficulty is not None and grade(puzzle) != difficulty:
+            continue
+        return puzzle
+    raise SodokuException('No puzzle with {} clues and difficulty {} in {} attempts'.format(
+        clues, difficulty, attempts))
+
+
+def _generate_packed(task):
+    seed, clues, difficulty, attempts = task
+    return bytes(generate(clues, difficulty, random.Random(seed), attempts))
+
+
+def generate_many(count, clues=None, difficulty=None, seed=None, workers=None, chunksize=16, attempts=100,
+                  as_board=False):
+    # Yields count puzzles made over a process pool, as CompactBoards or
+    # Boards.  Every puzzle has its own seed derived from seed, so a given
+    # seed makes the same puzzles whatever the number of workers.
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    tasks = (('{}:{}'.format(seed, index), clues, difficulty, attempts) for index in range(count))
+    if workers == 1:
+        for packed in map(_generate_packed, tasks):
+            puzzle = CompactBoard(packed)
+            yield puzzle.to_board() if as_board else puzzle
+        return
+
+    with multiprocessing.Pool(workers) as pool:
+        for packed in pool.imap(_generate_packed, tasks, chunksize):
+            puzzle = CompactBoard(packed)
+            yield puzzle.to_board() if as_board else puzzle
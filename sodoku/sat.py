@@ -0,0 +1,331 @@
+import heapq
+
+from .core import Strategy, StrategyException, Position
+
+# A CNF encoding of a Board solved with a small CDCL solver: two watched
+# literals per clause, first UIP clause learning with non-chronological
+# backjumping, VSIDS variable activity, phase saving and Luby restarts.
+# Variables are positive ints, literals are +var / -var.
+
+
+def luby(index):
+    # 1, 1, 2, 1, 1, 2, 4, 1, 1, 2, 1, 1, 2, 4, 8, ...
+    size, power = 1, 0
+    while size < index + 1:
+        power += 1
+        size = 2 * size + 1
+    while size - 1 != index:
+        size = (size - 1) >> 1
+        power -= 1
+        index = index % size
+    return 1 << power
+
+
+class CDCL:
+    def __init__(self, var_count=0, restart_unit=100, decay=0.95):
+        self.var_count = 0
+        self.clauses = []
+        self.watches = {}
+        self.values = [0]
+        self.levels = [0]
+        self.reasons = [None]
+        self.activity = [0.0]
+        self.phase = [False]
+        self.trail = []
+        self.trail_limits = []
+        self.queue_head = 0
+        self.increment = 1.0
+        self.decay = decay
+        self.restart_unit = restart_unit
+        self.order = []
+        self.unsatisfiable = False
+        self.conflicts = 0
+        self.decisions = 0
+        self.propagations = 0
+        for _ in range(var_count):
+            self.new_var()
+
+    def new_var(self):
+        self.var_count += 1
+        var = self.var_count
+        self.values.append(0)
+        self.levels.append(0)
+        self.reasons.append(None)
+        self.activity.append(0.0)
+        self.phase.append(False)
+        self.watches[var] = []
+        self.watches[-var] = []
+        heapq.heappush(self.order, (0.0, var))
+        return var
+
+    def value(self, literal):
+        value = self.values[abs(literal)]
+        return value if literal > 0 else -value
+
+    def add_clause(self, literals):
+        # Clauses are added at decision level 0, before solve().
+        clause = []
+        for literal in set(literals):
+            if -literal in literals or self.value(literal) == 1:
+                return
+            if self.value(literal) == 0:
+                clause.append(literal)
+        if not clause:
+            self.unsatisfiable = True
+        elif len(clause) == 1:
+            self.enqueue(clause[0], None)
+            if self.propagate() is not None:
+                self.unsatisfiable = True
+        else:
+            self.attach(clause)
+
+    def attach(self, clause):
+        index = len(self.clauses)
+        self.clauses.append(clause)
+        self.watches[clause[0]].append(index)
+        self.watches[clause[1]].append(index)
+        return index
+
+    def enqueue(self, literal, reason):
+        var = abs(literal)
+        self.values[var] = 1 if literal > 0 else -1
+        self.levels[var] = len(self.trail_limits)
+        self.reasons[var] = reason
+        self.trail.append(literal)
+
+    def propagate(self):
+        # Returns the index of a conflicting clause, or None.
+        values, clauses, watches, trail = self.values, self.clauses, self.watches, self.trail
+        while self.queue_head < len(trail):
+            false_literal = -trail[self.queue_head]
+            self.queue_head += 1
+            self.propagations += 1
+            watching = watches[false_literal]
+            kept = watches[false_literal] = []
+            for position, index in enumerate(watching):
+                clause = clauses[index]
+                if clause[0] == false_literal:
+                    clause[0], clause[1] = clause[1], false_literal
+                first = clause[0]
+                first_value = values[abs(first)] if first > 0 else -values[abs(first)]
+                if first_value == 1:
+                    kept.append(index)
+                    continue
+                for other in range(2, len(clause)):
+                    literal = clause[other]
+                    if (values[abs(literal)] if literal > 0 else -values[abs(literal)]) != -1:
+                        clause[1], clause[other] = literal, false_literal
+                        watches[literal].append(index)
+                        break
+                else:
+                    kept.append(index)
+                    if first_value == -1:
+                        kept.extend(watching[position + 1:])
+                        self.queue_head = len(trail)
+                        return index
+                    self.enqueue(first, index)
+        return None
+
+    def analyze(self, conflict):
+        # First UIP learning.  Returns the learnt clause, asserting literal
+        # first, and the level to jump back to.
+        levels, reasons, trail = self.levels, self.reasons, self.trail
+        level = len(self.trail_limits)
+        seen = set()
+        learnt = [None]
+        pending = 0
+        literal = None
+        position = len(trail) - 1
+        clause = self.clauses[conflict]
+        while True:
+            for other in (clause if literal is None else clause[1:]):
+                var = abs(other)
+                if var not in seen and levels[var] > 0:
+                    seen.add(var)
+                    self.bump(var)
+                    if levels[var] == level:
+                        pending += 1
+                    else:
+                        learnt.append(other)
+            while abs(trail[position]) not in seen:
+                position -= 1
+            literal = trail[position]
+            position -= 1
+            pending -= 1
+            if pending == 0:
+                break
+            clause = self.clauses[reasons[abs(literal)]]
+        learnt[0] = -literal
+
+        if len(learnt) == 1:
+            return learnt, 0
+        deepest = max(range(1, len(learnt)), key=lambda i: levels[abs(learnt[i])])
+        learnt[1], learnt[deepest] = learnt[deepest], learnt[1]
+        return learnt, levels[abs(learnt[1])]
+
+    def bump(self, var):
+        self.activity[var] += self.increment
+        if self.activity[var] > 1e100:
+            self.activity = [activity * 1e-100 for activity in self.activity]
+            self.increment *= 1e-100
+            self.order = [(-self.activity[var], var) for var in range(1, self.var_count + 1) if not self.values[var]]
+            heapq.heapify(self.order)
+        elif not self.values[var]:
+            heapq.heappush(self.order, (-self.activity[var], var))
+
+    def backtrack(self, level):
+        if len(self.trail_limits) <= level:
+            return
+        limit = self.trail_limits[level]
+        for literal in self.trail[limit:]:
+            var = abs(literal)
+            self.values[var] = 0
+            self.reasons[var] = None
+            self.phase[var] = literal > 0
+            heapq.heappush(self.order, (-self.activity[var], var))
+        del self.trail[limit:]
+        del self.trail_limits[level:]
+        self.queue_head = len(self.trail)
+
+    def pick_branch(self):
+        order, values, activity = self.order, self.values, self.activity
+        while order:
+            priority, var = heapq.heappop(order)
+            if not values[var] and -priority == activity[var]:
+                return var
+        for var in range(1, self.var_count + 1):
+            if not values[var]:
+                return var
+        return None
+
+    def solve(self):
+        # A model as the set of true variables, or None when unsatisfiable.
+        if self.unsatisfiable or self.propagate() is not None:
+            return None
+        restarts = 0
+        budget = self.restart_unit * luby(restarts)
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                if not self.trail_limits:
+                    return None
+                learnt, level = self.analyze(conflict)
+                self.backtrack(level)
+                if len(learnt) == 1:
+                    self.enqueue(learnt[0], None)
+                else:
+                    self.enqueue(learnt[0], self.attach(learnt))
+                self.increment /= self.decay
+                budget -= 1
+                if budget <= 0:
+                    restarts += 1
+                    budget = self.restart_unit * luby(restarts)
+                    self.backtrack(0)
+                continue
+
+            var = self.pick_branch()
+            if var is None:
+                return set(var for var in range(1, self.var_count + 1) if self.values[var] == 1)
+            self.decisions += 1
+            self.trail_limits.append(len(self.trail))
+            self.enqueue(var if self.phase[var] else -var, None)
+
+
+class Encoder:
+    # Builds the CNF of a board.  Every cell gets one variable per value it
+    # can still take; a filled cell only for its value.  literal() returns
+    # None for a value the cell cannot take, so clauses leave it out.
+    def __init__(self, board, solver=None):
+        self.board = board
+        self.solver = CDCL() if solver is None else solver
+        self.size = board.geometry.size
+        self.variables = {}
+        self.cells = {}
+        for cell in board.cells.flat:
+            if cell.value is not None:
+                values = (cell.value,)
+            else:
+                values = board.geometry.mask_values[cell.options_mask]
+            literals = []
+            for value in values:
+                var = self.solver.new_var()
+                self.variables[cell.row * self.size + cell.col, value] = var
+                self.cells[var] = (cell, value)
+                literals.append(var)
+            self.exactly_one(literals)
+
+        for constraint in board.all_constraints + board.variants:
+            sat_clauses = getattr(constraint, 'sat_clauses', None)
+            if sat_clauses is not None:
+                sat_clauses(self)
+            else:
+                self.distinct(constraint)
+
+    def literal(self, cell, value):
+        return self.variables.get((cell.row * self.size + cell.col, value))
+
+    def new_var(self):
+        return self.solver.new_var()
+
+    def add_clause(self, literals):
+        self.solver.add_clause(literals)
+
+    def at_most_one(self, literals):
+        for i, first in enumerate(literals):
+            for second in literals[i + 1:]:
+                self.solver.add_clause((-first, -second))
+
+    def exactly_one(self, literals):
+        self.solver.add_clause(literals)
+        self.at_most_one(literals)
+
+    def distinct(self, constraint):
+        # The default encoding of a Constraint: no value twice, and every
+        # value somewhere when it is a unit.
+        for value in constraint.geometry.all_values:
+            literals = [var for var in (self.literal(cell, value) for cell in constraint.cells) if var is not None]
+            if constraint.is_unit:
+                self.exactly_one(literals)
+            else:
+                self.at_most_one(literals)
+
+    def positions(self, model):
+        for var in sorted(model):
+            cell, value = self.cells.get(var, (None, None))
+            if cell is not None and cell.value is None:
+                yield cell, value
+
+
+def solve_sat(board, history=None, in_place=False):
+    if not in_place:
+        board = board.copy()
+    encoder = Encoder(board)
+    model = encoder.solver.solve()
+    if model is None:
+        raise StrategyException('The board has no solution.')
+
+    history = list(history) if history else []
+    for cell, value in list(encoder.positions(model)):
+        cell.value = value
+        history.append(Position(cell.col, cell.row, value))
+    return board, history
+
+
+class SatSolver(Strategy):
+    def solve(self):
+        board, history = solve_sat(self.board, in_place=True)
+        self.history += history
+        return board, self.history
+
+    def solve_one_cell(self):
+        if self.board.is_complete:
+            return
+
+        encoder = Encoder(self.board)
+        model = encoder.solver.solve()
+        if model is None:
+            raise StrategyException('The board has no solution.')
+        cell, value = next(encoder.positions(model))
+        cell.value = value
+        self.history.append(Position(cell.col, cell.row, value))
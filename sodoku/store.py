@@ -0,0 +1,198 @@
+import mmap
+import os
+import struct
+import zlib
+from contextlib import contextmanager
+
+from .core import CELL_COUNT, SodokuException
+
+# A file of puzzle -> solution records that survives restarts and is shared
+# between processes.  The file is a header and an open addressing hash
+# table of fixed width slots: 81 puzzle values then 81 solution values, a
+# first byte of EMPTY for a free slot.  Readers mmap it and look puzzles up
+# in place; get() returns a memoryview of the solution inside the mapping.
+# Records are written once: a puzzle already stored keeps its solution, so
+# a view handed out never changes under its holder.  Writers take a lock
+# file, fill a free slot with its first byte written last, and when the
+# table is half full write a larger copy and os.replace() it, so readers
+# holding the old mapping still see a consistent table and remap when they
+# find the file replaced.
+MAGIC = b'SODOKUS1'
+HEADER = struct.Struct('<8sQQ')
+HEADER_SIZE = 64
+COUNT_OFFSET = 16
+RECORD_SIZE = 2 * CELL_COUNT
+EMPTY = 0xFF
+
+
+def _empty_table(capacity):
+    table = bytearray(HEADER_SIZE + capacity * RECORD_SIZE)
+    table[HEADER_SIZE::RECORD_SIZE] = bytes([EMPTY]) * capacity
+    HEADER.pack_into(table, 0, MAGIC, capacity, 0)
+    return table
+
+
+def _probe(table, capacity, key):
+    # The offset of key's slot, or of the free slot it would go in, and
+    # whether it was found.
+    slot = zlib.crc32(key) % capacity
+    while True:
+        offset = HEADER_SIZE + slot * RECORD_SIZE
+        if table[offset] == EMPTY:
+            return offset, False
+        if table[offset:offset + CELL_COUNT] == key:
+            return offset, True
+        slot = (slot + 1) % capacity
+
+
+def _check(values):
+    values = bytes(values)
+    if len(values) != CELL_COUNT:
+        raise SodokuException('A stored grid needs {} values, got {}'.format(CELL_COUNT, len(values)))
+    if max(values) > 9:
+        raise SodokuException('A stored grid holds values 0-9, got {}'.format(max(values)))
+    return values
+
+
+class PuzzleStore:
+    def __init__(self, path, capacity=1024, readonly=False):
+        self.path = os.fspath(path)
+        self.readonly = readonly
+        self.mapping = None
+        if not os.path.exists(self.path):
+            if readonly:
+                raise SodokuException('No puzzle store at {}'.format(self.path))
+            with self._locked():
+                if not os.path.exists(self.path):
+                    self._replace(_empty_table(max(capacity, 2)))
+        self._map()
+
+    @contextmanager
+    def _locked(self):
+        # flock where there is fcntl, msvcrt's byte lock on Windows.
+        with open(self.path + '.lock', 'a+b') as lock:
+            try:
+                import fcntl
+            except ImportError:
+                import msvcrt
+                lock.seek(0)
+                msvcrt.locking(lock.fileno(), msvcrt.LK_LOCK, 1)
+                try:
+                    yield
+                finally:
+                    lock.seek(0)
+                    msvcrt.locking(lock.fileno(), msvcrt.LK_UNLCK, 1)
+                return
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _replace(self, table):
+        temporary = '{}.{}.tmp'.format(self.path, os.getpid())
+        with open(temporary, 'wb') as f:
+            f.write(table)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.path)
+
+    def _map(self):
+        # Mappings are dropped, not closed: views handed out by get() keep
+        # the old one alive until they go.
+        with open(self.path, 'rb' if self.readonly else 'r+b') as f:
+            stat = os.fstat(f.fileno())
+            magic, capacity, count = HEADER.unpack(f.read(HEADER.size).ljust(HEADER.size, b'\0'))
+            if (magic != MAGIC or capacity <= 0 or count >= capacity
+                    or stat.st_size != HEADER_SIZE + capacity * RECORD_SIZE):
+                raise SodokuException('{} is not a puzzle store'.format(self.path))
+            access = mmap.ACCESS_READ if self.readonly else mmap.ACCESS_WRITE
+            self.mapping = mmap.mmap(f.fileno(), 0, access=access)
+            self.inode = stat.st_ino
+        self.capacity = capacity
+        self.view = memoryview(self.mapping)
+
+    def _is_stale(self):
+        try:
+            return os.stat(self.path).st_ino != self.inode
+        except FileNotFoundError:
+            return False
+
+    def get(self, key, default=None):
+        key = _check(key)
+        offset, found = _probe(self.view, self.capacity, key)
+        if not found and self._is_stale():
+            self._map()
+            offset, found = _probe(self.view, self.capacity, key)
+        if not found:
+            return default
+        return self.view[offset + CELL_COUNT:offset + RECORD_SIZE]
+
+    def __getitem__(self, key):
+        solution = self.get(key)
+        if solution is None:
+            raise KeyError(key)
+        return solution
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __setitem__(self, key, solution):
+        if self.readonly:
+            raise SodokuException('The puzzle store {} is read only'.format(self.path))
+        key, solution = _check(key), _check(solution)
+        with self._locked():
+            if self._is_stale():
+                self._map()
+            offset, found = _probe(self.view, self.capacity, key)
+            if found:
+                return
+            if 2 * (len(self) + 1) > self.capacity:
+                self._grow(key, solution)
+                return
+            self.view[offset + 1:offset + CELL_COUNT] = key[1:]
+            self.view[offset + CELL_COUNT:offset + RECORD_SIZE] = solution
+            self.view[offset] = key[0]
+            struct.pack_into('<Q', self.view, COUNT_OFFSET, len(self) + 1)
+
+    def _grow(self, key, solution):
+        capacity = self.capacity * 2
+        table = _empty_table(capacity)
+        count = 0
+        for old_key, old_solution in list(self.items()) + [(key, solution)]:
+            offset, _ = _probe(table, capacity, old_key)
+            table[offset:offset + RECORD_SIZE] = old_key + old_solution
+            count += 1
+        struct.pack_into('<Q', table, COUNT_OFFSET, count)
+        self._replace(table)
+        self._map()
+
+    def __len__(self):
+        return struct.unpack_from('<Q', self.view, COUNT_OFFSET)[0]
+
+    def items(self):
+        view = self.view
+        for offset in range(HEADER_SIZE, len(view), RECORD_SIZE):
+            if view[offset] != EMPTY:
+                yield bytes(view[offset:offset + CELL_COUNT]), bytes(view[offset + CELL_COUNT:offset + RECORD_SIZE])
+
+    def flush(self):
+        if not self.readonly:
+            self.mapping.flush()
+
+    def close(self):
+        if self.mapping is None:
+            return
+        self.flush()
+        self.view.release()
+        try:
+            self.mapping.close()
+        except BufferError:
+            pass
+        self.mapping = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
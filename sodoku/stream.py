@@ -0,0 +1,74 @@
+import gzip
+import mmap
+import os
+
+from .core import Board
+from .compact import CompactBoard
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+def _is_gzip(path):
+    with open(path, 'rb') as f:
+        return f.read(2) == GZIP_MAGIC
+
+
+def _lines(source, use_mmap):
+    if not isinstance(source, (str, bytes, os.PathLike)):
+        yield from source
+        return
+
+    if _is_gzip(source):
+        with gzip.open(source, 'rb') as f:
+            yield from f
+    elif use_mmap:
+        with open(source, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield from iter(mapped.readline, b'')
+    else:
+        with open(source, 'rb') as f:
+            yield from f
+
+
+def read_puzzles(source, use_mmap=False, as_board=False):
+    # source is a path (plain or gzip compressed) or an iterable of lines,
+    # e.g. an open file.  Blank lines and lines starting with '#' are skipped
+    # and anything after the first whitespace on a line is ignored.
+    for line in _lines(source, use_mmap):
+        if isinstance(line, str):
+            line = line.encode('ascii', 'replace')
+        fields = line.split(None, 1)
+        if not fields or fields[0].startswith(b'#'):
+            continue
+        board = CompactBoard.from_line(fields[0])
+        yield board.to_board() if as_board else board
+
+
+def format_line(board, blank='.'):
+    if isinstance(board, Board):
+        board = CompactBoard.from_board(board)
+    return board.to_line(blank)
+
+
+def write_puzzles(target, boards, blank='.', compress=None):
+    # target is a path or a file opened in text mode.  Paths ending in .gz
+    # are gzip compressed unless compress says otherwise.
+    if not isinstance(target, (str, bytes, os.PathLike)):
+        return _write_lines(target, boards, blank)
+
+    if compress is None:
+        compress = os.fspath(target).endswith('.gz' if isinstance(target, str) else b'.gz')
+    opener = gzip.open if compress else open
+    with opener(target, 'wt', encoding='ascii') as f:
+        return _write_lines(f, boards, blank)
+
+
+def _write_lines(f, boards, blank):
+    count = 0
+    for board in boards:
+        f.write(format_line(board, blank))
+        f.write('\n')
+        count += 1
+    return count
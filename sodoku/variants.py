@@ -0,0 +1,184 @@
+from itertools import combinations
+
+from .core import Constraint, ConstraintException, SodokuException
+
+# Variant constraints for Board.add_constraints(), e.g.
+#
+#     board.add_constraints(diagonal_constraints(board))
+#     board.add_constraints(killer_cages(board, [(10, (0, 1)), (17, (2, 11, 20))]))
+#
+# Cells are given by their row major index, row * size + col.
+
+
+class ConstraintExceptionDiagonal(ConstraintException):
+    pass
+
+
+class ConstraintExceptionPair(ConstraintException):
+    pass
+
+
+class ConstraintExceptionCage(ConstraintException):
+    pass
+
+
+class DiagonalConstraint(Constraint):
+    constraint_exception = ConstraintExceptionDiagonal
+
+
+class PairConstraint(Constraint):
+    # Two cells that may not hold the same value.
+    constraint_exception = ConstraintExceptionPair
+    is_unit = False
+
+
+_CAGE_COMBINATIONS = {}
+
+
+def cage_combinations(size, count, total):
+    # Masks of the sets of count distinct values from 1..size that add up to
+    # total, worked out once per cage shape.
+    key = size, count, total
+    if key not in _CAGE_COMBINATIONS:
+        _CAGE_COMBINATIONS[key] = tuple(sum(1 << (value - 1) for value in values)
+                                        for values in combinations(range(1, size + 1), count)
+                                        if sum(values) == total)
+    return _CAGE_COMBINATIONS[key]
+
+
+def can_fill(masks):
+    # Whether cells can take distinct values, each from its mask: a
+    # bipartite matching of cells to value bits, grown by augmenting paths.
+    owner = {}
+
+    def augment(cell, seen):
+        options = masks[cell] & ~seen[0]
+        while options:
+            bit = options & -options
+            options ^= bit
+            seen[0] |= bit
+            if bit not in owner or augment(owner[bit], seen):
+                owner[bit] = cell
+                return True
+        return False
+
+    return all(augment(cell, [0]) for cell in range(len(masks)))
+
+
+class CageConstraint(Constraint):
+    # Distinct values adding up to total.  The empty cells can only take the
+    # values of the combinations that contain every value already placed;
+    # propagate() also drops the combinations their candidates cannot fill.
+    constraint_exception = ConstraintExceptionCage
+    is_unit = False
+
+    def __init__(self, cells, total):
+        cells = list(cells)
+        self.total = total
+        self.combinations = cage_combinations(cells[0].geometry.size, len(cells), total)
+        if not self.combinations:
+            raise SodokuException('No {} distinct values add up to {}'.format(len(cells), total))
+        super().__init__(cells)
+        self.update_blocked()
+
+    def add_value(self, value):
+        super().add_value(value)
+        self.update_blocked()
+
+    def remove_value(self, value):
+        super().remove_value(value)
+        self.update_blocked()
+
+    def update_blocked(self):
+        used = self.used
+        allowed = 0
+        for combination in self.combinations:
+            if combination & used == used:
+                allowed |= combination
+        self.blocked = self.geometry.full_mask & ~(allowed & ~used)
+        self.consistent = allowed != 0
+
+    def cell_has_changed(self, cell, previous=None):
+        super().cell_has_changed(cell, previous)
+        if cell.value is not None and not self.consistent:
+            raise self.constraint_exception('Cage values {} cannot add up to {}'.format(
+                [other_cell.value for other_cell in self.cells], self.total))
+
+    def propagate(self, board, trail):
+        # Keeps each empty cell to the values of the combinations the empty
+        # cells can still fill with distinct candidates.  None when no
+        # combination fits.
+        size = self.geometry.size
+        empty = [cell for cell in self.cells if cell.value is None]
+        if not empty:
+            return False
+        masks = [board.options[cell.row * size + cell.col] for cell in empty]
+        used = self.used
+        allowed = [0] * len(empty)
+        fits = False
+        for combination in self.combinations:
+            if combination & used != used:
+                continue
+            rest = [mask & combination & ~used for mask in masks]
+            if not can_fill(rest):
+                continue
+            fits = True
+            for i, mask in enumerate(rest):
+                allowed[i] |= mask
+        if not fits:
+            return None
+        progress = False
+        for cell, mask, keep in zip(empty, masks, allowed):
+            if mask & ~keep:
+                trail.eliminate(cell, mask & ~keep)
+                progress = True
+        return progress
+
+    def copy_to(self, board):
+        return type(self)([board.cells[cell.row][cell.col] for cell in self.cells], self.total)
+
+    def sat_clauses(self, encoder):
+        # For sodoku.sat: distinct values, plus one selector per combination
+        # that keeps every value outside it out of the cage.
+        encoder.distinct(self)
+        selectors = []
+        for combination in self.combinations:
+            selector = encoder.new_var()
+            selectors.append(selector)
+            for value in self.geometry.mask_values[self.geometry.full_mask & ~combination]:
+                for cell in self.cells:
+                    literal = encoder.literal(cell, value)
+                    if literal is not None:
+                        encoder.add_clause((-selector, -literal))
+        encoder.add_clause(selectors)
+
+
+def diagonal_constraints(board):
+    size = board.geometry.size
+    flat = board.cells.flat
+    return [DiagonalConstraint([flat[i * size + i] for i in range(size)]),
+            DiagonalConstraint([flat[i * size + size - 1 - i] for i in range(size)])]
+
+
+def anti_knight_constraints(board):
+    # One pair per two cells a knight's move apart, unless they already
+    # share a box.
+    g = board.geometry
+    flat = board.cells.flat
+    pairs = []
+    for index in range(g.cell_count):
+        row, col = g.row_of[index], g.col_of[index]
+        for row_step, col_step in ((1, -2), (1, 2), (2, -1), (2, 1)):
+            other_row, other_col = row + row_step, col + col_step
+            if not (0 <= other_row < g.size and 0 <= other_col < g.size):
+                continue
+            other = other_row * g.size + other_col
+            if g.box_of[other] != g.box_of[index]:
+                pairs.append(PairConstraint([flat[index], flat[other]]))
+    return pairs
+
+
+def killer_cages(board, cages):
+    # cages: (total, cell indexes) pairs.
+    flat = board.cells.flat
+    return [CageConstraint([flat[index] for index in indexes], total) for total, indexes in cages]
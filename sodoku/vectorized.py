@@ -0,0 +1,118 @@
+import numpy as np
+
+from .core import CELL_COUNT, UNITS, UNITS_OF, FULL_MASK, ALL_VALUES
+from .compact import CompactBoard
+from .batch import pack
+from .dlx import exact_cover_solutions
+
+# Many boards at once as an (N, 81) uint8 array of values, 0 for a blank,
+# with candidates as (N, 81) uint16 masks in the layout of core's masks.
+UNIT_INDEX = np.array(UNITS, dtype=np.intp)
+UNITS_OF_INDEX = np.array(UNITS_OF, dtype=np.intp)
+DIGITS = np.array(sorted(ALL_VALUES), dtype=np.uint8)
+DIGIT_SHIFTS = DIGITS.astype(np.uint16) - 1
+VALUE_BITS = np.array([0] + [1 << shift for shift in range(len(ALL_VALUES))], dtype=np.uint16)
+# The value of a single bit mask, 0 for any other mask.
+SINGLE_VALUE = np.zeros(FULL_MASK + 1, dtype=np.uint8)
+SINGLE_VALUE[VALUE_BITS[1:]] = DIGITS
+
+# Board states returned by propagate().
+STUCK, SOLVED, DEAD = 0, 1, -1
+
+
+def as_array(puzzles):
+    # Boards, CompactBoards, puzzle lines or value lists, as accepted by
+    # batch.pack, to an (N, 81) array.
+    data = b''.join(pack(puzzle) for puzzle in puzzles)
+    return np.frombuffer(data, dtype=np.uint8).reshape(-1, CELL_COUNT).copy()
+
+
+def to_boards(values):
+    return [CompactBoard(row.tobytes()) for row in values]
+
+
+def unit_used(values):
+    return np.bitwise_or.reduce(VALUE_BITS[values][:, UNIT_INDEX], axis=2)
+
+
+def candidates(values, used=None):
+    if used is None:
+        used = unit_used(values)
+    blocked = np.bitwise_or.reduce(used[:, UNITS_OF_INDEX], axis=2)
+    masks = FULL_MASK & ~blocked
+    masks[values != 0] = 0
+    return masks
+
+
+def places(masks):
+    # (N, 27, 9 cells, 9 digits): whether each cell of each unit can take
+    # each digit.
+    return (masks[:, UNIT_INDEX][..., None] >> DIGIT_SHIFTS) & 1 == 1
+
+
+def dead_boards(values, masks, used, can_place):
+    digits = values[:, UNIT_INDEX][..., None] == DIGITS
+    duplicates = (digits.sum(axis=2) > 1).any(axis=(1, 2))
+    empty = ((values == 0) & (masks == 0)).any(axis=1)
+    missing = (used[..., None] >> DIGIT_SHIFTS) & 1 == 0
+    stuck = (missing & ~can_place.any(axis=2)).any(axis=(1, 2))
+    return duplicates | empty | stuck
+
+
+def naked_singles(masks):
+    # Values of the empty cells with a single candidate, 0 elsewhere.
+    return SINGLE_VALUE[masks]
+
+
+def hidden_singles(masks, can_place, used):
+    # Board, cell and value of every digit with one place left in a unit
+    # that does not hold it yet.
+    missing = (used[..., None] >> DIGIT_SHIFTS) & 1 == 0
+    boards, units, digits = np.nonzero((can_place.sum(axis=2) == 1) & missing)
+    cells = UNIT_INDEX[units, can_place[boards, units, :, digits].argmax(axis=1)]
+    return boards, cells, DIGITS[digits]
+
+
+def propagate(values):
+    # Naked and hidden singles on every board in place until none is left.
+    # Returns the state of each board: SOLVED, DEAD (a contradiction) or
+    # STUCK (needs a guess).  Dead boards are no longer updated.
+    states = np.full(len(values), STUCK, dtype=np.int8)
+    live = np.arange(len(values))
+    while len(live):
+        current = values[live]
+        used = unit_used(current)
+        masks = candidates(current, used)
+        can_place = places(masks)
+
+        dead = dead_boards(current, masks, used, can_place)
+        states[live[dead]] = DEAD
+        solved = ~dead & (current != 0).all(axis=1)
+        states[live[solved]] = SOLVED
+        keep = ~(dead | solved)
+
+        singles = naked_singles(masks)
+        boards, cells, digits = hidden_singles(masks, can_place, used)
+        singles[boards, cells] = digits
+        singles[~keep] = 0
+        changed = keep & (singles != 0).any(axis=1)
+        values[live] = current | singles
+        live = live[changed]
+    return states
+
+
+def solve_array(values):
+    # Propagates all boards together and finishes the ones left STUCK one by
+    # one with the exact cover solver.  Returns the solved values and a mask
+    # of the boards that have a solution.
+    values = np.array(values, dtype=np.uint8)
+    states = propagate(values)
+    for index in np.nonzero(states == STUCK)[0]:
+        solution = next(exact_cover_solutions(values[index]), None)
+        if solution is None:
+            states[index] = DEAD
+            continue
+        for cell, value in solution:
+            values[index, cell] = value
+        states[index] = SOLVED
+    return values, states == SOLVED
@@ -0,0 +1,49 @@
+from unittest import TestCase, main
+
+from sodoku import Board, CompactBoard, solve_many, solve_exact_cover
+
+PUZZLES = [
+    '003020600900305001001806400008102900700000008006708200002609500800203009005010300',
+    '4.....8.5.3..........7......2.....6.....8.4......1.......6.3.7.5..2.....1.4......',
+    '981300000005000800000050004508031060043000190060740305600070000004000600000003521',
+    '52...6.........7.13...........4..8..6......5...........418.........3..2...87.....',
+]
+UNSOLVABLE = '12345678.' + '........9' + '.' * 63
+
+
+class TestSolveMany(TestCase):
+    def check(self, results, puzzles):
+        self.assertEqual(len(puzzles), len(results))
+        for result in results:
+            puzzle = CompactBoard.from_line(puzzles[result.index])
+            self.assertEqual(puzzle, result.puzzle)
+            self.assertTrue(result.solution.is_complete)
+            for given, solved in zip(puzzle.values, result.solution.values):
+                self.assertIn(given, (0, solved))
+
+    def test_in_process(self):
+        results = list(solve_many(PUZZLES, workers=1))
+        self.assertEqual(list(range(len(PUZZLES))), [result.index for result in results])
+        self.check(results, PUZZLES)
+
+    def test_pool(self):
+        results = list(solve_many(PUZZLES * 3, workers=2, chunksize=2))
+        self.assertEqual(list(range(len(PUZZLES) * 3)), [result.index for result in results])
+        self.check(results, PUZZLES * 3)
+
+    def test_pool_unordered(self):
+        results = list(solve_many(PUZZLES, workers=2, chunksize=1, ordered=False, solver=solve_exact_cover))
+        self.check(results, PUZZLES)
+
+    def test_inputs_and_failures(self):
+        inputs = [Board(values=CompactBoard.from_line(PUZZLES[0]).values),
+                  CompactBoard.from_line(PUZZLES[1]),
+                  UNSOLVABLE]
+        results = list(solve_many(inputs, workers=1))
+        self.assertTrue(results[0].solution.is_complete)
+        self.assertTrue(results[1].solution.is_complete)
+        self.assertIsNone(results[2].solution)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+from unittest import TestCase, main
+from random import Random
+
+from sodoku import Board, CompactBoard, Position, StrategyException
+from sodoku import SolutionCache, canonical_form, diagonal_constraints
+
+EASY = '003020600900305001001806400008102900700000008006708200002609500800203009005010300'
+HARD = '8..........36......7..9.2...5...7.......457.....1...3...1....68..85...1..9....4..'
+
+
+def shuffled(line, rng):
+    # An equivalent puzzle: transposed, bands, stacks, rows, columns and
+    # digits shuffled.
+    values = CompactBoard.from_line(line).values
+    transpose = rng.random() < 0.5
+
+    def order():
+        return [band * 3 + line for band in rng.sample(range(3), 3) for line in rng.sample(range(3), 3)]
+
+    digits = [0] + rng.sample(range(1, 10), 9)
+    rows, cols = order(), order()
+    return bytes(digits[values[col * 9 + row] if transpose else values[row * 9 + col]]
+                 for row in rows for col in cols)
+
+
+class TestCanonicalForm(TestCase):
+    def test_transform(self):
+        values = CompactBoard.from_line(HARD).values
+        form, transform = canonical_form(values)
+        self.assertEqual(form, transform.apply(values))
+        self.assertEqual(bytes(values), transform.invert(form))
+
+    def test_equivalent_puzzles(self):
+        rng = Random(0)
+        for line in (EASY, HARD):
+            form, _ = canonical_form(CompactBoard.from_line(line).values)
+            for _ in range(5):
+                self.assertEqual(form, canonical_form(shuffled(line, rng))[0])
+
+    def test_different_puzzles(self):
+        self.assertNotEqual(canonical_form(CompactBoard.from_line(EASY).values)[0],
+                            canonical_form(CompactBoard.from_line(HARD).values)[0])
+
+    def test_relabelled(self):
+        form, _ = canonical_form(CompactBoard.from_line(HARD).values)
+        seen = [value for value in form if value]
+        self.assertEqual(list(range(1, 10)), sorted(set(seen)))
+        self.assertEqual(1, seen[0])
+
+
+class TestSolutionCache(TestCase):
+    def test_solve(self):
+        cache = SolutionCache()
+        board, history = cache.solve(CompactBoard.from_line(EASY).to_board())
+        self.assertTrue(board.is_complete)
+        self.assertEqual(EASY.count('0'), len(history))
+        self.assertEqual((0, 1), (cache.hits, cache.misses))
+
+        again, _ = cache.solve(CompactBoard.from_line(EASY).to_board())
+        self.assertEqual(str(board), str(again))
+        self.assertEqual((1, 1), (cache.hits, cache.misses))
+
+    def test_equivalent_puzzle_hits(self):
+        cache = SolutionCache()
+        cache.solve(CompactBoard.from_line(HARD).to_board())
+        puzzle = shuffled(HARD, Random(1))
+        board, history = cache.solve(CompactBoard(puzzle).to_board())
+        self.assertEqual((1, 1), (cache.hits, cache.misses))
+        self.assertTrue(board.is_complete)
+        solution = bytes(CompactBoard.from_board(board))
+        for given, value in zip(puzzle, solution):
+            if given:
+                self.assertEqual(given, value)
+        for position in history:
+            self.assertEqual(position.value, solution[position.row * 9 + position.col])
+
+    def test_lru(self):
+        cache = SolutionCache(maxsize=2)
+        cache.solve(CompactBoard.from_line(EASY).to_board())
+        self.assertEqual(2, len(cache))
+        cache.solve(CompactBoard.from_line(HARD).to_board())
+        self.assertEqual(2, len(cache))
+        cache.solve(CompactBoard.from_line(EASY).to_board())
+        self.assertEqual(0, cache.hits)
+
+    def test_store(self):
+        store = {}
+        SolutionCache(store=store).solve(CompactBoard.from_line(EASY).to_board())
+        self.assertEqual(1, len(store))
+
+        cache = SolutionCache(store=store)
+        board, _ = cache.solve(CompactBoard(shuffled(EASY, Random(2))).to_board())
+        self.assertEqual((1, 0), (cache.hits, cache.misses))
+        self.assertTrue(board.is_complete)
+
+    def test_variants_bypass(self):
+        cache = SolutionCache()
+        board = Board()
+        board.add_constraints(diagonal_constraints(board))
+        earlier = [Position(0, 0, 1)]
+        solved, history = cache.solve(board, earlier)
+        self.assertTrue(solved.is_complete)
+        self.assertEqual(0, len(cache))
+        self.assertEqual(earlier, history[:1])
+        self.assertEqual(82, len(history))
+
+        solved, history = SolutionCache().solve(Board(size=4), earlier)
+        self.assertTrue(solved.is_complete)
+        self.assertEqual(earlier, history[:1])
+        self.assertEqual(17, len(history))
+
+    def test_no_solution(self):
+        values = CompactBoard.from_line(EASY).values
+        values[1] = 5
+        with self.assertRaises(StrategyException):
+            SolutionCache().solve(CompactBoard(values).to_board())
+
+
+if __name__ == '__main__':
+    main()
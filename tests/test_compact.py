@@ -0,0 +1,75 @@
+from unittest import TestCase, main
+import copy
+
+from sodoku import Board, CompactBoard, CompactCell, ConstraintExceptionRow, ConstraintExceptionCol
+from sodoku import ConstraintExceptionBox, SodokuException, read_board
+from sodoku import PEERS, BOX_UNITS
+
+
+SOLVED = ('6 5 4 1 7 9 2 3 8\n'
+          '1 2 3 8 6 4 5 7 9\n'
+          '8 7 9 5 3 2 1 4 6\n'
+          '4 8 1 3 9 5 7 6 2\n'
+          '7 3 2 6 4 1 9 8 5\n'
+          '5 9 6 7 2 8 3 1 4\n'
+          '9 4 7 2 8 3 6 5 1\n'
+          '2 6 5 4 1 7 8 9 3\n'
+          '3 1 8 9 5 6 4 2 7')
+
+
+class TestCompactBoard(TestCase):
+    def test_tables(self):
+        self.assertEqual(81, len(PEERS))
+        for index, peers in enumerate(PEERS):
+            self.assertEqual(20, len(peers))
+            self.assertNotIn(index, peers)
+        self.assertEqual((0, 9, 18, 1, 10, 19, 2, 11, 20), BOX_UNITS[0])
+
+    def test_round_trip(self):
+        board = read_board(SOLVED)
+        compact = CompactBoard.from_board(board)
+        self.assertEqual(81, len(bytes(compact)))
+        self.assertTrue(compact.is_complete)
+        self.assertEqual(str(board), str(compact))
+        self.assertEqual(str(board), str(compact.to_board()))
+
+    def test_copy_is_independent(self):
+        compact = CompactBoard.from_board(read_board(SOLVED))
+        clone = compact.copy()
+        self.assertEqual(compact, clone)
+        clone[0][0].value = None
+        self.assertNotEqual(compact, clone)
+        self.assertEqual(6, compact[0][0].value)
+        self.assertEqual(compact, copy.deepcopy(compact))
+
+    def test_cells(self):
+        compact = CompactBoard()
+        compact[0][0].value = 1
+        compact[1][1].value = 2
+        cell = compact.cell(2, 2)
+        self.assertIsInstance(cell, CompactCell)
+        self.assertEqual({3, 4, 5, 6, 7, 8, 9}, cell.remaining_options)
+        self.assertEqual(Board()[2][2], cell)
+
+        with self.assertRaises(ConstraintExceptionRow):
+            compact[0][5].value = 1
+        with self.assertRaises(ConstraintExceptionCol):
+            compact[5][0].value = 1
+        with self.assertRaises(ConstraintExceptionBox):
+            compact[2][1].value = 1
+        with self.assertRaises(Exception):
+            compact[4][4].value = 10
+        self.assertIsNone(compact[0][5].value)
+
+    def test_bad_length(self):
+        with self.assertRaises(SodokuException):
+            CompactBoard(bytes(80))
+
+    def test_other_sizes(self):
+        for size in (4, 16):
+            with self.assertRaises(SodokuException):
+                CompactBoard.from_board(Board(size=size))
+
+
+if __name__ == '__main__':
+    main()
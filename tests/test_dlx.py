@@ -0,0 +1,127 @@
+from unittest import TestCase, main
+import itertools
+
+from sodoku import Board, ExactCover, StrategyException, read_board, solve_exact_cover
+from sodoku import CompactBoard, count_solutions, iter_solutions, has_unique_solution
+from sodoku import SodokuException, diagonal_constraints
+from sodoku.dlx import DancingLinks, exact_cover_solutions
+
+SOLVED = '654179238123864579879532146481395762732641985596728314947283651265417893318956427'
+INKALA = '8..........36......7..9.2...5...7.......457.....1...3...1....68..85...1..9....4..'
+
+
+def line_values(line):
+    return [int(char) if char in '123456789' else 0 for char in line]
+
+
+class TestDancingLinks(TestCase):
+    def test_knuth_example(self):
+        links = DancingLinks(7)
+        rows = {
+            'A': (0, 3, 6),
+            'B': (0, 3),
+            'C': (3, 4, 6),
+            'D': (2, 4, 5),
+            'E': (1, 2, 5, 6),
+            'F': (1, 6),
+        }
+        for name, columns in sorted(rows.items()):
+            links.add_row(name, columns)
+        self.assertEqual([['B', 'D', 'F']], [sorted(s) for s in links.solutions()])
+
+    def test_copy_is_independent(self):
+        links = DancingLinks(2)
+        links.add_row('a', (0,))
+        links.add_row('b', (1,))
+        clone = links.copy()
+        clone.select(len(clone.column) - 1)
+        self.assertEqual([['a', 'b']], [sorted(s) for s in links.solutions()])
+        self.assertEqual([['a']], list(clone.solutions()))
+
+
+class TestExactCover(TestCase):
+    def test_solve(self):
+        board = Board(values=line_values(INKALA))
+        solved_board, history = solve_exact_cover(board)
+        self.assertTrue(solved_board.is_complete)
+        self.assertFalse(board.is_complete)
+        self.assertEqual(81 - 21, len(history))
+        for position in history:
+            self.assertIsNone(board[position.row][position.col].value)
+            self.assertEqual(position.value, solved_board[position.row][position.col].value)
+
+    def test_strategy(self):
+        board = Board(ExactCover, line_values(INKALA))
+        board.solve_one_cell()
+        self.assertEqual(1, len(board.history))
+        solved_board, history = board.solve()
+        self.assertIs(board, solved_board)
+        self.assertTrue(board.is_complete)
+        self.assertEqual(81 - 21, len(history))
+
+    def test_multiple_solutions(self):
+        self.assertEqual(2, len(list(itertools.islice(exact_cover_solutions([0] * 81), 2))))
+
+    def test_no_solution(self):
+        board = read_board('1 2 3 4 5 6 7 8 #\n# # # # # # # # 9\n' + '\n'.join(['# # # # # # # # #'] * 7))
+        with self.assertRaises(StrategyException):
+            solve_exact_cover(board)
+
+        values = [0] * 81
+        values[0] = values[1] = 5
+        self.assertEqual([], list(exact_cover_solutions(values)))
+
+    def test_other_sizes_refused(self):
+        for size in (4, 16):
+            board = Board(ExactCover, size=size)
+            for attempt in (board.solve, lambda: count_solutions(board), lambda: has_unique_solution(board)):
+                with self.assertRaises(SodokuException):
+                    attempt()
+            self.assertTrue(all(cell.value is None for cell in board.cells))
+
+    def test_variants_refused(self):
+        board = Board(ExactCover)
+        board.add_constraints(diagonal_constraints(board))
+        for attempt in (board.solve, board.solve_one_cell, lambda: solve_exact_cover(board, in_place=True),
+                        lambda: count_solutions(board), lambda: has_unique_solution(board),
+                        lambda: list(iter_solutions(board))):
+            with self.assertRaises(SodokuException):
+                attempt()
+        self.assertTrue(all(cell.value is None for cell in board.cells))
+
+
+class TestCountSolutions(TestCase):
+    def test_unique(self):
+        board = Board(values=line_values(INKALA))
+        self.assertEqual(1, count_solutions(board))
+        self.assertTrue(has_unique_solution(board))
+        self.assertTrue(has_unique_solution(CompactBoard.from_line(INKALA)))
+
+    def test_limit(self):
+        self.assertEqual(2, count_solutions(Board()))
+        self.assertEqual(5, count_solutions(CompactBoard(), limit=5))
+        self.assertFalse(has_unique_solution(Board()))
+
+    def test_two_solutions(self):
+        # Swapping the 5s and 2s of this rectangle gives a second grid.
+        board = CompactBoard.from_line(SOLVED)
+        for index in (1, 6, 10, 15):
+            board.values[index] = 0
+        self.assertEqual(2, count_solutions(board, limit=None))
+        solutions = list(iter_solutions(board))
+        self.assertIn(CompactBoard.from_line(SOLVED), solutions)
+        self.assertEqual(2, len(solutions))
+        for solution in solutions:
+            self.assertTrue(solution.is_complete)
+        self.assertEqual(4, sum(a != b for a, b in zip(*[s.values for s in solutions])))
+        self.assertEqual(0, board.values[1])
+
+    def test_no_solution(self):
+        values = [0] * 81
+        values[0] = values[1] = 5
+        self.assertEqual(0, count_solutions(CompactBoard(values)))
+        self.assertEqual([], list(iter_solutions(CompactBoard(values))))
+
+
+if __name__ == '__main__':
+    main()
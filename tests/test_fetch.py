@@ -0,0 +1,186 @@
+from unittest import TestCase, main
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from sodoku import CompactBoard, SodokuException, Fetcher, FetchException, fetch_boards, download_boards, download_board
+
+PUZZLES = [
+    '003020600900305001001806400008102900700000008006708200002609500800203009005010300',
+    '981300000005000800000050004508031060043000190060740305600070000004000600000003521',
+]
+
+
+def page(line):
+    # Inputs like the websudoku page in test_parse_response, a value
+    # attribute only on the givens; parse_response puts f{a}{b} at board[a][b].
+    inputs = []
+    for row in range(9):
+        for col in range(9):
+            value = line[row * 9 + col]
+            attributes = ' readonly="" value="{}"'.format(value) if value != '0' else ' maxlength="1"'
+            inputs.append('<td><input autocomplete="off" id="f{}{}" size="2"{}/></td>'.format(row, col, attributes))
+    return '<html><body><table>{}</table></body></html>'.format(''.join(inputs)).encode()
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_GET(self):
+        server = self.server
+        self.requests = getattr(self, 'requests', 0) + 1
+        with server.lock:
+            server.active += 1
+            server.most_active = max(server.most_active, server.active)
+            server.attempts[self.path] = server.attempts.get(self.path, 0) + 1
+            attempts = server.attempts[self.path]
+        try:
+            time.sleep(0.02)
+            kind, _, number = self.path.strip('/').partition('/')
+            if kind == 'slow':
+                time.sleep(0.5)
+            if kind == 'once' and self.requests > 1:
+                # Drop a kept alive connection without answering.
+                self.close_connection = True
+            elif kind == 'flaky' and attempts < 3:
+                self.reply(503, b'busy')
+            elif kind in ('puzzle', 'flaky', 'slow', 'once'):
+                self.reply(200, page(PUZZLES[int(number) % len(PUZZLES)]))
+            elif kind == 'limited':
+                self.reply(200, b'<html>rate limited</html>')
+            else:
+                self.reply(404, b'not found')
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def reply(self, status, body):
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestFetch(TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.server.lock = threading.Lock()
+        self.server.connections = self.server.active = self.server.most_active = 0
+        self.server.attempts = {}
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.base = 'http://127.0.0.1:{}'.format(self.server.server_address[1])
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def check(self, board, line):
+        self.assertEqual(CompactBoard.from_line(line), CompactBoard.from_board(board))
+
+    def test_download_board(self):
+        self.check(download_board(self.base + '/puzzle/0'), PUZZLES[0])
+
+    def test_download_boards(self):
+        addresses = ['{}/puzzle/{}'.format(self.base, number) for number in range(12)]
+        results = download_boards(addresses, concurrency=3)
+        self.assertEqual(list(range(12)), [result.index for result in results])
+        for number, result in enumerate(results):
+            self.assertIsNone(result.error)
+            self.check(result.board, PUZZLES[number % 2])
+        self.assertLessEqual(self.server.most_active, 3)
+        self.assertGreater(self.server.most_active, 1)
+        self.assertLessEqual(self.server.connections, 3)
+
+    def test_queue(self):
+        async def run():
+            queue = asyncio.Queue()
+            task = asyncio.ensure_future(fetch_boards(['{}/puzzle/{}'.format(self.base, number) for number in range(4)], queue))
+            results = []
+            while True:
+                result = await queue.get()
+                if result is None:
+                    break
+                results.append(result)
+            await task
+            return results
+
+        results = asyncio.run(run())
+        self.assertEqual([0, 1, 2, 3], sorted(result.index for result in results))
+
+    def test_retries(self):
+        async def run():
+            async with Fetcher(retries=3, backoff=0.01) as fetcher:
+                return await fetcher.fetch_board(self.base + '/flaky/1')
+
+        self.check(asyncio.run(run()), PUZZLES[1])
+        self.assertEqual(3, self.server.attempts['/flaky/1'])
+
+    def test_backoff_frees_slot(self):
+        # With one slot, the puzzles are fetched while the flaky page waits
+        # to try again.
+        async def run():
+            queue = asyncio.Queue()
+            addresses = [self.base + '/flaky/0'] + ['{}/puzzle/{}'.format(self.base, number) for number in range(3)]
+            task = asyncio.ensure_future(fetch_boards(addresses, queue, concurrency=1, backoff=0.3))
+            order = []
+            while True:
+                result = await queue.get()
+                if result is None:
+                    break
+                self.assertIsNone(result.error)
+                order.append(result.index)
+            await task
+            return order
+
+        self.assertEqual([1, 2, 3, 0], asyncio.run(run()))
+        self.assertEqual(1, self.server.most_active)
+
+    def test_failures(self):
+        results = download_boards([self.base + '/missing', self.base + '/slow/0', self.base + '/flaky/0'],
+                                  timeout=0.2, retries=1, backoff=0.01)
+        for result in results:
+            self.assertIsNone(result.board)
+            self.assertIsInstance(result.error, FetchException)
+        self.assertEqual(1, self.server.attempts['/missing'])
+        self.assertEqual(2, self.server.attempts['/slow/0'])
+        self.assertEqual(2, self.server.attempts['/flaky/0'])
+
+    def test_page_without_puzzle(self):
+        addresses = ['{}/puzzle/{}'.format(self.base, number) for number in range(3)] + [self.base + '/limited']
+        results = download_boards(addresses)
+        for number in range(3):
+            self.check(results[number].board, PUZZLES[number % 2])
+        self.assertIsNone(results[3].board)
+        self.assertIsInstance(results[3].error, SodokuException)
+
+    def test_closed_keep_alive(self):
+        async def run():
+            async with Fetcher(concurrency=1, retries=0) as fetcher:
+                first = await fetcher.fetch_board(self.base + '/once/0')
+                second = await fetcher.fetch_board(self.base + '/once/1')
+                return first, second, fetcher.connections_opened
+
+        first, second, connections = asyncio.run(run())
+        self.check(first, PUZZLES[0])
+        self.check(second, PUZZLES[1])
+        self.assertEqual(2, connections)
+
+    def test_bad_address(self):
+        with self.assertRaises(FetchException):
+            download_board('ftp://127.0.0.1/puzzle')
+
+
+if __name__ == '__main__':
+    main()
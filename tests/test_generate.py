@@ -0,0 +1,70 @@
+from unittest import TestCase, main
+import io
+from random import Random
+
+from sodoku import Board, CompactBoard, SodokuException, read_puzzles, write_puzzles, has_unique_solution
+from sodoku import generate, generate_many, grade, random_grid
+
+EASY = '003020600900305001001806400008102900700000008006708200002609500800203009005010300'
+MEDIUM = '981300000005000800000050004508031060043000190060740305600070000004000600000003521'
+HARD = '8..........36......7..9.2...5...7.......457.....1...3...1....68..85...1..9....4..'
+
+
+def clue_count(puzzle):
+    return sum(1 for value in puzzle.values if value)
+
+
+class TestGenerate(TestCase):
+    def test_random_grid(self):
+        grids = [random_grid(Random(seed)) for seed in range(3)]
+        for grid in grids:
+            self.assertTrue(grid.is_complete)
+        self.assertNotEqual(grids[0], grids[1])
+        self.assertEqual(grids[2], random_grid(Random(2)))
+
+    def test_grade(self):
+        self.assertEqual('easy', grade(CompactBoard.from_line(EASY)))
+        self.assertEqual('medium', grade(CompactBoard.from_line(MEDIUM)))
+        self.assertEqual('hard', grade(CompactBoard.from_line(HARD).to_board()))
+
+    def test_generate(self):
+        puzzle = generate(rng=Random(1))
+        self.assertTrue(has_unique_solution(puzzle))
+        self.assertLess(clue_count(puzzle), 35)
+
+    def test_clues(self):
+        puzzle = generate(clues=32, rng=Random(2))
+        self.assertEqual(32, clue_count(puzzle))
+        self.assertTrue(has_unique_solution(puzzle))
+
+    def test_difficulty(self):
+        for difficulty in ('easy', 'medium', 'hard'):
+            puzzle = generate(difficulty=difficulty, rng=Random(3))
+            self.assertEqual(difficulty, grade(puzzle))
+            self.assertTrue(has_unique_solution(puzzle))
+
+    def test_bad_arguments(self):
+        with self.assertRaises(SodokuException):
+            generate(clues=16)
+        with self.assertRaises(SodokuException):
+            generate(difficulty='fiendish')
+        with self.assertRaises(SodokuException):
+            generate(clues=17, difficulty='easy', attempts=1)
+
+    def test_generate_many(self):
+        puzzles = list(generate_many(4, clues=30, seed=5, workers=1))
+        self.assertEqual(4, len(puzzles))
+        self.assertEqual(puzzles, list(generate_many(4, clues=30, seed=5, workers=2, chunksize=1)))
+        for puzzle in puzzles:
+            self.assertEqual(30, clue_count(puzzle))
+
+        boards = list(generate_many(2, seed=5, workers=1, as_board=True))
+        self.assertIsInstance(boards[0], Board)
+
+        output = io.StringIO()
+        self.assertEqual(4, write_puzzles(output, puzzles))
+        self.assertEqual(puzzles, list(read_puzzles(io.StringIO(output.getvalue()))))
+
+
+if __name__ == '__main__':
+    main()
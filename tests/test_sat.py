@@ -0,0 +1,104 @@
+from unittest import TestCase, main
+
+from sodoku import Board, CompactBoard, StrategyException, read_board
+from sodoku.sat import CDCL, SatSolver, luby, solve_sat
+from sodoku.variants import anti_knight_constraints, diagonal_constraints, killer_cages
+
+SOLVED = '654179238123864579879532146481395762732641985596728314947283651265417893318956427'
+HARD = [
+    '8..........36......7..9.2...5...7.......457.....1...3...1....68..85...1..9....4..',
+    '1.......2.9.4...5...6...7...5.9.3.......7.......85..4.7.....6...3...9.8...2.....1',
+    '.......39.....1..5..3.5.8....8.9...6.7...2...1..4.......9.8..5..2....6..4..7.....',
+]
+
+
+def values(board):
+    return [cell.value for cell in board.cells.flat]
+
+
+class TestCDCL(TestCase):
+    def test_luby(self):
+        self.assertEqual([1, 1, 2, 1, 1, 2, 4, 1, 1, 2, 1, 1, 2, 4, 8], [luby(i) for i in range(15)])
+
+    def test_satisfiable(self):
+        solver = CDCL(3)
+        for clause in ((1, 2), (-1, 3), (-3, -2), (-1, -2)):
+            solver.add_clause(clause)
+        model = solver.solve()
+        self.assertIsNotNone(model)
+        for clause in ((1, 2), (-1, 3), (-3, -2), (-1, -2)):
+            self.assertTrue(any((literal > 0) == (abs(literal) in model) for literal in clause))
+
+    def test_unsatisfiable(self):
+        # Pigeonhole: three pigeons, two holes.
+        solver = CDCL(6)
+        for pigeon in range(3):
+            solver.add_clause((2 * pigeon + 1, 2 * pigeon + 2))
+        for hole in (1, 2):
+            for first in range(3):
+                for second in range(first + 1, 3):
+                    solver.add_clause((-(2 * first + hole), -(2 * second + hole)))
+        self.assertIsNone(solver.solve())
+        self.assertGreater(solver.conflicts, 0)
+
+
+class TestSolveSat(TestCase):
+    def test_hard(self):
+        for line in HARD:
+            board = CompactBoard.from_line(line).to_board()
+            solved_board, history = solve_sat(board)
+            self.assertTrue(solved_board.is_complete)
+            self.assertFalse(board.is_complete)
+            self.assertEqual(line.count('.'), len(history))
+            for position in history:
+                self.assertIsNone(board.cells[position.row][position.col].value)
+
+    def test_no_solution(self):
+        board = read_board('1 2 3 4 5 6 7 8 #\n# # # # # # # # 9\n' + '\n'.join(['# # # # # # # # #'] * 7))
+        with self.assertRaises(StrategyException):
+            solve_sat(board)
+
+    def test_strategy(self):
+        board = CompactBoard.from_line(HARD[0]).to_board(SatSolver)
+        board.solve_one_cell()
+        self.assertEqual(1, len(board.history))
+        solved_board, history = board.solve()
+        self.assertIs(board, solved_board)
+        self.assertTrue(board.is_complete)
+        self.assertEqual(HARD[0].count('.'), len(history))
+
+    def test_sizes(self):
+        for size in (4, 16):
+            solved_board, history = solve_sat(Board(size=size))
+            self.assertTrue(solved_board.is_complete)
+            self.assertEqual(size * size, len(history))
+
+    def test_variants(self):
+        board = Board()
+        board.add_constraints(diagonal_constraints(board))
+        board.add_constraints(anti_knight_constraints(board))
+        solved_board, _ = solve_sat(board)
+        self.assertTrue(solved_board.is_complete)
+        grid = values(solved_board)
+        self.assertEqual(9, len(set(grid[i * 10] for i in range(9))))
+        self.assertEqual(9, len(set(grid[i * 8 + 8] for i in range(9))))
+        for index in range(81):
+            row, col = divmod(index, 9)
+            for other_row, other_col in ((row + 1, col + 2), (row + 2, col + 1), (row + 1, col - 2), (row + 2, col - 1)):
+                if 0 <= other_row < 9 and 0 <= other_col < 9:
+                    self.assertNotEqual(grid[index], grid[other_row * 9 + other_col])
+
+    def test_killer(self):
+        solution = [int(char) for char in SOLVED]
+        cages = [(solution[i] + solution[i + 1], (i, i + 1)) for row in range(9) for i in range(row * 9, row * 9 + 8, 2)]
+        board = Board()
+        board.add_constraints(killer_cages(board, cages))
+        solved_board, _ = solve_sat(board)
+        grid = values(solved_board)
+        self.assertTrue(solved_board.is_complete)
+        for total, indexes in cages:
+            self.assertEqual(total, sum(grid[index] for index in indexes))
+
+
+if __name__ == '__main__':
+    main()
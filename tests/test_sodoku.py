@@ -1,13 +1,19 @@
 from unittest import TestCase, main
 from unittest import mock
+import copy
 import logging
+from random import Random
 
 logging.basicConfig(level=logging.WARN)
 logger = logging.getLogger(__name__)
 
 from sodoku import Board, Cell, box_generator, ConstraintException, Cells, ConstraintExceptionRow
 from sodoku import ConstraintExceptionCol, ConstraintExceptionBox, Position, RowConstraint
-from sodoku import StrategyException, read_board, solve, download_board, parse_response
+from sodoku import StrategyException, read_board, solve, download_board, parse_response, parse_values, Trail
+from sodoku.core import _parse_values_soup
+from sodoku import propagate, solve_with_stats, SolveStats
+from sodoku import Guessing, CompactBoard, SodokuException, geometry
+from sodoku import Heuristic, CELL_ORDERS, VALUE_ORDERS, least_constraining_value, diagonal_constraints
 
 logger.setLevel(logging.WARN)
 
@@ -16,6 +22,94 @@ class TestBoard(TestCase):
         board = Board()
         self.assertFalse(board.is_complete)
 
+    def test_complete_tracking(self):
+        string =   ('6 5 4 1 7 9 2 3 8\n'
+                    '1 2 3 8 6 4 5 7 9\n'
+                    '8 7 9 5 3 2 1 4 6\n'
+                    '4 8 1 3 9 5 7 6 2\n'
+                    '7 3 2 6 4 1 9 8 5\n'
+                    '5 9 6 7 2 8 3 1 4\n'
+                    '9 4 7 2 8 3 6 5 1\n'
+                    '2 6 5 4 1 7 8 9 3\n'
+                    '3 1 8 9 5 6 4 2 7')
+        board = read_board(string)
+        self.assertTrue(board.is_complete)
+        self.assertEqual(81, board.filled)
+        self.assertEqual(27, len(board.complete_units))
+
+        board[4][4].value = None
+        self.assertFalse(board.is_complete)
+        self.assertEqual(80, board.filled)
+        self.assertEqual(24, len(board.complete_units))
+
+        with self.assertRaises(ConstraintException):
+            board[4][4].value = 5
+        self.assertFalse(board.is_complete)
+        self.assertEqual(81, board.filled)
+
+        board[4][4].value = 4
+        self.assertTrue(board.is_complete)
+        self.assertTrue(Board(values=[cell.value for cell in board.cells]).is_complete)
+
+    def test_dead_end_tracking(self):
+        board = Board()
+        for col, value in enumerate([1, 2, 3, 4, 5, 6, 7, 8]):
+            board[0][col].value = value
+        self.assertFalse(board.is_dead_end)
+
+        board[1][8].value = 9
+        self.assertTrue(board.is_dead_end)
+        self.assertEqual({8}, board.empty_cells)
+        board[1][8].value = None
+        self.assertFalse(board.is_dead_end)
+
+        board = Board()
+        for row, col in [(0, 1), (4, 2), (6, 4), (7, 7)]:
+            board[row][col].value = 1
+        self.assertFalse(board.is_dead_end)
+        board[8][0].eliminated = 1
+        self.assertTrue(board.is_dead_end)
+        self.assertFalse(board.empty_cells)
+        self.assertIn((9 + 0, 1), board.stuck_units)
+        board[8][0].eliminated = 0
+        self.assertFalse(board.is_dead_end)
+
+    def test_tracking_matches_new_board(self):
+        random = Random(3)
+        board = Board()
+        trail = Trail()
+        for step in range(400):
+            cell = board.cells.flat[random.randrange(81)]
+            if cell.value is None and cell.remaining_options and random.random() < 0.7:
+                trail.assign(cell, random.choice(sorted(cell.remaining_options)))
+            elif cell.value is None and cell.remaining_options:
+                trail.eliminate(cell, 1 << random.randrange(9))
+            elif random.random() < 0.3:
+                trail.undo(random.randrange(len(trail) + 1))
+
+            fresh = Board(values=[c.value for c in board.cells.flat])
+            for c, other in zip(board.cells.flat, fresh.cells.flat):
+                other.eliminated = c.eliminated
+            fresh.setup_tracking()
+            self.assertEqual(fresh.options, board.options)
+            self.assertEqual(fresh.places, board.places)
+            self.assertEqual(fresh.empty_cells, board.empty_cells)
+            self.assertEqual(fresh.stuck_units, board.stuck_units)
+            self.assertEqual(fresh.filled, board.filled)
+            self.assertEqual(fresh.buckets, board.buckets)
+            self.assertEqual(fresh.bucket_of, board.bucket_of)
+
+    def test_best_cell(self):
+        board = Board()
+        self.assertEqual(9, board.bucket_of[0])
+        for value in range(1, 9):
+            board[0][value].value = value
+        self.assertEqual(0, board.best_cell())
+        self.assertEqual(1, board.bucket_of[0])
+        board[0][0].value = 9
+        self.assertIsNone(board.bucket_of[0])
+        self.assertNotEqual(0, board.best_cell())
+
     def test_board_cells(self):
         board = Board()
         self.assertEqual(81, len(board.cells))
@@ -128,6 +222,24 @@ class TestBoard(TestCase):
             '\nExpected: %s\nFound:    %s' % (expected_box_indexes, found_list_indexes)
         )
 
+    def test_small_board_str(self):
+        board = read_board('1 # # #\n# # 3 #\n# 4 # #\n# # # 2')
+        self.assertEqual(4, board.geometry.size)
+        self.assertEqual(('1   |    \n'
+                          '    | 3  \n'
+                          '---------\n'
+                          '  4 |    \n'
+                          '    |   2'), str(board))
+
+    def test_large_board_str(self):
+        board = Board(size=16)
+        board.cells[0][0].value = 16
+        board.cells[0][1].value = 2
+        lines = str(board).split('\n')
+        self.assertEqual(16 + 3, len(lines))
+        self.assertEqual('16  2       |', lines[0][:13])
+        self.assertEqual('-' * len(lines[0]), lines[4])
+
     def test_board_str(self):
         board = Board()
         expected_str = ('      |       |      \n'
@@ -234,6 +346,51 @@ class TestBoard(TestCase):
 
         logger.debug(board.cells_as_str(repr))
 
+    def test_board_copy(self):
+        board = Board()
+        board[0][0].value = 1
+        board[4][5].value = 7
+        board.history.append(Position(0, 0, 1))
+
+        clone = copy.deepcopy(board)
+        self.assertEqual(str(board), str(clone))
+        self.assertEqual(board.history, clone.history)
+        self.assertEqual(board[0][8].remaining_options, clone[0][8].remaining_options)
+
+        clone[0][0].value = None
+        self.assertEqual(1, board[0][0].value)
+        self.assertEqual(board[0][8].remaining_options, {2, 3, 4, 5, 6, 7, 8, 9})
+        self.assertEqual(clone[0][8].remaining_options, {1, 2, 3, 4, 5, 6, 7, 8, 9})
+
+    def test_board_copy_tracking(self):
+        # The copied tracking matches what setup_tracking() works out, and
+        # moves on independently.
+        board = CompactBoard.from_line(
+            '003020600900305001001806400008102900700000008006708200002609500800203009005010300').to_board()
+        board.add_constraints(diagonal_constraints(board))
+        board.cells.flat[1].eliminated = 0b10
+        clone = board.copy()
+
+        def tracking(board):
+            return (board.filled, sorted(board.units.index(unit) for unit in board.complete_units), board.options,
+                    board.buckets, board.bucket_of, board.places, board.stuck_units)
+
+        copied = tracking(clone)
+        self.assertEqual(tracking(board), copied)
+        self.assertEqual(0b10, clone.cells.flat[1].eliminated)
+        self.assertEqual(len(board.variants), len(clone.variants))
+        for cell in clone.cells.flat:
+            self.assertIs(clone, cell.listeners[-1])
+            cell.listeners.remove(clone)
+        clone.setup_tracking()
+        self.assertEqual(copied, tracking(clone))
+
+        clone.cells.flat[0].value = 4
+        self.assertIsNone(board.cells.flat[0].value)
+        self.assertEqual(copied[0], board.filled)
+        self.assertEqual(copied[0] + 1, clone.filled)
+        self.assertNotEqual(board.options, clone.options)
+
     def test_number_of_constraints(self):
         board = Board()
 
@@ -306,6 +463,31 @@ class TestBoard(TestCase):
             {1,2,3,4,5,6,7,8,9}
         )
 
+    def test_remaining_options_cleared(self):
+        board = Board()
+        board[0][0].value = 1
+        board[0][1].value = 2
+        self.assertEqual(board[0][8].option_count, 7)
+
+        board[0][0].value = 3
+        self.assertEqual(board[0][8].remaining_options, {1, 4, 5, 6, 7, 8, 9})
+
+        board[0][0].value = None
+        board[0][1].value = None
+        self.assertEqual(board[0][8].remaining_options, {1, 2, 3, 4, 5, 6, 7, 8, 9})
+        self.assertEqual(board.rows[0].used, 0)
+
+    def test_rejected_value_is_tracked(self):
+        board = Board()
+        board[0][0].value = 1
+        with self.assertRaises(ConstraintExceptionRow):
+            board[0][4].value = 1
+
+        board[0][0].value = None
+        self.assertEqual(board[0][8].remaining_options, {2, 3, 4, 5, 6, 7, 8, 9})
+        board[0][4].value = None
+        self.assertEqual(board[0][8].remaining_options, {1, 2, 3, 4, 5, 6, 7, 8, 9})
+
     def test_simple_game(self):
         board = Board()
         simple_game_0 = (
@@ -420,6 +602,122 @@ class TestBoard(TestCase):
                 board.solve_one_cell()
                 logger.debug('\n{}'.format(board.remaining_string))
 
+    def test_guessing_solve(self):
+        board = CompactBoard.from_line(
+            '1.......2.9.4...5...6...7...5.9.3.......7.......85..4.7.....6...3...9.8...2.....1').to_board(Guessing)
+        solved_board, history = board.solve()
+        self.assertIs(board, solved_board)
+        self.assertTrue(board.is_complete)
+        self.assertEqual(81 - 21, len(set((p.col, p.row) for p in history)))
+
+    def test_guessing_solve_one_cell(self):
+        board = CompactBoard.from_line(
+            '4.....8.5.3..........7......2.....6.....8.4......1.......6.3.7.5..2.....1.4......').to_board(Guessing)
+        board.solve_one_cell()
+        self.assertEqual(18, board.filled)
+        self.assertEqual(1, len(board.history))
+
+        position = board.history[0]
+        board.cells.flat[position.row * 9 + position.col].value = None
+        for _ in range(81 - 17):
+            board.solve_one_cell()
+        self.assertTrue(board.is_complete)
+        self.assertEqual(81 - 17, len(board.history) - 1)
+
+    def test_guessing_replans(self):
+        board = Board(Guessing)
+        board.solve_one_cell()
+        planned = board.strategy.solution
+        cell = board.cells.flat[80]
+        cell.value = next(value for value in sorted(cell.remaining_options) if value != planned[80])
+        board.solve_one_cell()
+        self.assertIsNot(planned, board.strategy.solution)
+        self.assertEqual(cell.value, board.strategy.solution[80])
+
+    def test_guessing_no_solution(self):
+        board = Board(Guessing)
+        for col in range(8):
+            board.cells.flat[col].value = col + 1
+        board.cells.flat[9 * 5 + 8].value = 9
+        with self.assertRaises(StrategyException):
+            board.solve_one_cell()
+        with self.assertRaises(StrategyException):
+            board.solve()
+
+    def test_search_depth(self):
+        # The search keeps its own stack, so a deep search does not recurse.
+        solved_board, _, stats = solve_with_stats(Board(), displayer=lambda string: None, propagation=False)
+        self.assertTrue(solved_board.is_complete)
+        self.assertEqual(81, stats.max_depth)
+
+    def test_geometry(self):
+        for size in (4, 9, 16, 25):
+            g = geometry(size)
+            self.assertEqual(size * size, g.cell_count)
+            self.assertEqual(3 * size, len(g.units))
+            self.assertEqual(3 * size - 2 * g.box_size - 1, len(g.peers[0]))
+            for unit in g.units:
+                self.assertEqual(size, len(set(unit)))
+            self.assertEqual(g.all_values, set(g.mask_values[g.full_mask]))
+            self.assertEqual(size, g.mask_size[g.full_mask])
+        self.assertIs(geometry(16), geometry(16))
+        with self.assertRaises(SodokuException):
+            geometry(10)
+
+    def test_board_sizes(self):
+        for size in (4, 16):
+            board = Board(size=size)
+            board.cells[0][0].value = size
+            with self.assertRaises(Exception):
+                board.cells[0][1].value = size + 1
+            with self.assertRaises(ConstraintExceptionRow):
+                board.cells[0][1].value = size
+            board.cells[0][1].value = None
+            solved_board, history = solve(board, displayer=lambda string: None)
+            self.assertTrue(solved_board.is_complete)
+            self.assertEqual(size * size - 1, len(history))
+            self.assertEqual(size, solved_board.copy().geometry.size)
+            for unit in solved_board.all_constraints:
+                self.assertEqual(set(range(1, size + 1)), set(cell.value for cell in unit))
+
+    def test_propagate(self):
+        string =   ('9 8 1 3 # # # # #\n'
+                    '# # 5 # # # 8 # #\n'
+                    '# # # # 5 # # # 4\n'
+
+                    '5 # 8 # 3 1 # 6 #\n'
+                    '# 4 3 # # # 1 9 #\n'
+                    '# 6 # 7 4 # 3 # 5\n'
+
+                    '6 # # # 7 # # # #\n'
+                    '# # 4 # # # 6 # #\n'
+                    '# # # # # 3 5 2 1')
+
+        board = read_board(string)
+        history = []
+        self.assertTrue(propagate(board, history=history))
+        self.assertTrue(board.is_complete)
+        self.assertEqual(81 - 30, len(history))
+
+    def test_propagate_undo(self):
+        board = read_board('1 2 3 4 5 6 7 8 #\n' + '\n'.join(['# # # # # # # # #'] * 8))
+        board[1][3].value = 9
+        trail = Trail()
+        self.assertTrue(propagate(board, trail))
+        self.assertEqual(9, board[0][8].value)
+
+        trail.undo()
+        self.assertIsNone(board[0][8].value)
+        self.assertEqual({9}, board[0][8].remaining_options)
+        self.assertEqual(0, sum(cell.eliminated for cell in board.cells))
+
+    def test_propagate_contradiction(self):
+        board = Board()
+        for col, value in enumerate([1, 2, 3, 4, 5, 6, 7, 8]):
+            board[0][col].value = value
+        board[1][8].value = 9
+        self.assertFalse(propagate(board))
+
     def test_guessing_strategy(self):
         string =   ('6 5 4 1 7 9 2 3 8\n'
                     '1 2 3 8 6 4 5 7 9\n'
@@ -487,6 +785,133 @@ class TestBoard(TestCase):
         logger.debug('Solved!\n{}\n{}'.format(solved_board, '\n'.join(str(s) for s in solution)))
         self.assertTrue(solved_board.is_complete)
 
+    def test_solve_in_place(self):
+        string =   ('6 5 4 1 7 9 2 3 8\n'
+                    '1 2 3 8 6 4 5 7 9\n'
+                    '8 7 9 5 3 2 1 4 6\n'
+
+                    '4 8 1 3 9 5 7 6 2\n'
+                    '7 3 2 6 4 1 9 8 5\n'
+                    '5 9 6 7 2 8 3 1 4\n'
+
+                    '9 4 7 2 8 3 6 5 1\n'
+                    '2 6 5 4 1 7 8 9 3\n'
+                    '3 1 8 9 5 6 4 2 7')
+
+        board = read_board(string)
+        for row, col in [(0, 0), (0, 1), (5, 0), (7, 1), (5, 2), (7, 2), (0, 8)]:
+            board[row][col].value = None
+
+        solved_board, solution = solve(board)
+        self.assertIsNot(solved_board, board)
+        self.assertFalse(board.is_complete)
+        self.assertEqual(len(solution), 7)
+
+        solved_board, solution = solve(board, in_place=True)
+        self.assertIs(solved_board, board)
+        self.assertTrue(board.is_complete)
+        for position in solution:
+            self.assertEqual(position.value, board[position.row][position.col].value)
+
+    def test_solve_tracer(self):
+        board = Board()
+        events = []
+        with mock.patch('sodoku.core.concat_board_str') as concat_board_str:
+            solved_board, solution = solve(board, displayer=lambda string: None, tracer=events.append)
+            concat_board_str.assert_not_called()
+
+        self.assertTrue(solved_board.is_complete)
+        kinds = [event.kind for event in events]
+        self.assertEqual('solution', kinds[-1])
+        self.assertIn('guess', kinds)
+        for event in events:
+            if event.kind == 'guess':
+                self.assertIsInstance(event.position, Position)
+                self.assertGreaterEqual(event.depth, 1)
+
+    def test_solve_stats(self):
+        reported = []
+        solved_board, solution, stats = solve_with_stats(Board(), displayer=lambda string: None,
+                                                         on_stats=reported.append)
+        self.assertTrue(solved_board.is_complete)
+        self.assertEqual([stats], reported)
+        self.assertEqual(81, len(solution))
+        self.assertGreater(stats.nodes, 0)
+        self.assertGreaterEqual(stats.guesses, stats.nodes)
+        self.assertLessEqual(len(solution) - (stats.guesses - stats.backtracks), stats.propagated_cells)
+        self.assertGreaterEqual(stats.max_depth, 1)
+        self.assertGreater(stats.candidate_evaluations, 0)
+        self.assertGreater(stats.elapsed, stats.propagation_time)
+        self.assertAlmostEqual(stats.elapsed, stats.propagation_time + stats.branching_time)
+
+    def test_candidate_evaluations(self):
+        evaluations = {}
+        for name in ('mrv', 'easy-first'):
+            _, _, stats = solve_with_stats(Board(), displayer=lambda string: None, propagation=False,
+                                           heuristic=Heuristic(CELL_ORDERS[name]))
+            evaluations[name] = stats.candidate_evaluations, stats.nodes
+        self.assertEqual(evaluations['mrv'][1], evaluations['mrv'][0])
+        # Every empty cell is scored: 81 + 80 + ... + 1 on an empty board.
+        self.assertEqual(81 * 82 // 2, evaluations['easy-first'][0])
+
+    def test_solve_heuristics(self):
+        for cell_name, select_cell in CELL_ORDERS.items():
+            for value_name, order_values in VALUE_ORDERS.items():
+                heuristic = Heuristic(select_cell, order_values)
+                solved_board, _ = solve(Board(), displayer=lambda string: None, heuristic=heuristic)
+                self.assertTrue(solved_board.is_complete, (cell_name, value_name))
+
+    def test_least_constraining_value(self):
+        for other_value, expected in ((8, [8, 9]), (9, [9, 8])):
+            board = Board()
+            for index in range(1, 8):
+                board.cells.flat[index].value = index
+            # Only 8 and 9 are left for cell 0.  Placing one of them in
+            # column 1 further down takes it out of two more cells of the
+            # first box, so that value constrains fewer other cells.
+            board.cells.flat[28].value = other_value
+            self.assertEqual(expected, list(least_constraining_value(board, 0)))
+
+    def test_custom_cell_order(self):
+        picked = []
+
+        def last_cell(board):
+            indexes = [index for bucket in board.buckets[1:] for index in bucket]
+            picked.append(max(indexes) if indexes else None)
+            return picked[-1]
+
+        solved_board, _ = solve(Board(), displayer=lambda string: None, propagation=False,
+                                heuristic=Heuristic(last_cell))
+        self.assertTrue(solved_board.is_complete)
+        self.assertEqual(80, picked[0])
+
+    def test_solve_stats_failure(self):
+        board = Board()
+        for col, value in enumerate([1, 2, 3, 4, 5, 6, 7, 8]):
+            board[0][col].value = value
+        board[1][8].value = 9
+        stats = SolveStats()
+        with self.assertRaises(StrategyException):
+            solve(board, displayer=lambda string: None, stats=stats)
+        self.assertEqual(1, stats.dead_ends)
+        self.assertEqual(0, stats.nodes)
+
+    def test_trail_undo(self):
+        board = Board()
+        trail = Trail()
+        trail.assign(board[0][0], 1)
+        mark = len(trail)
+        trail.assign(board[0][1], 2)
+        trail.assign(board[0][0], 3)
+
+        trail.undo(mark)
+        self.assertEqual(1, board[0][0].value)
+        self.assertIsNone(board[0][1].value)
+
+        trail.undo()
+        self.assertIsNone(board[0][0].value)
+        self.assertEqual(board.rows[0].used, 0)
+
     def test_download_board(self):
         address = 'http://view.websudoku.com/?level=1'
         board = download_board(address)
@@ -1078,7 +1503,75 @@ class TestBoard(TestCase):
         </html>
 
         '''
-        parse_response(response)
+        board = parse_response(response)
+        self.assertEqual(1, board[0][0].value)
+        self.assertIsNone(board[1][0].value)
+        values = parse_values(response)
+        self.assertEqual(_parse_values_soup(response.encode()), values)
+        self.assertEqual(26, sum(1 for value in values if value))
+        self.assertEqual(CompactBoard(values), CompactBoard.from_page(response.encode()))
+
+    def test_parse_values_attribute_order(self):
+        inputs = ''.join("<INPUT value='{}' class=s0 ID=f{}{} readonly>".format((a + b) % 9 + 1, a, b)
+                         for a in range(9) for b in range(9))
+        values = parse_values('<table>{}</table>'.format(inputs))
+        self.assertEqual([(a + b) % 9 + 1 for a in range(9) for b in range(9)], list(values))
+
+    def test_parse_values_quoted(self):
+        inputs = ''.join('<input id="f{}{}" title="a>b" value="{}"/>'.format(a, b, 5 if a == b == 0 else '')
+                         for a in range(9) for b in range(9))
+        values = parse_values(inputs)
+        self.assertEqual(5, values[0])
+        self.assertEqual(1, sum(1 for value in values if value))
+
+    def test_parse_values_no_puzzle(self):
+        with self.assertRaises(SodokuException):
+            parse_values(b'<html>rate limited</html>')
+        with self.assertRaises(SodokuException):
+            parse_response('<input id="f00" value="1"/>')
+
+    def test_parse_values_out_of_range(self):
+        for value in ('12', 'x', '0'):
+            inputs = ''.join('<input id="f{}{}" value="{}"/>'.format(a, b, value if a == b == 4 else '')
+                             for a in range(9) for b in range(9))
+            with self.assertRaises(SodokuException):
+                parse_values(inputs)
+            with self.assertRaises(SodokuException):
+                CompactBoard.from_page(inputs.encode())
+
+    def test_parse_values_duplicate_ids(self):
+        # Row 8's ids replaced by row 0's: BeautifulSoup finds no f80.
+        inputs = ''.join('<input id="f{}{}" value="{}"/>'.format(a if a < 8 else 0, b, b + 1)
+                         for a in range(9) for b in range(9))
+        with self.assertRaises(SodokuException):
+            parse_values(inputs)
+
+    def test_parse_values_ids_outside_grid(self):
+        inputs = ''.join('<input id="f{}{}" value=""/>'.format(a, b) for a in range(9) for b in range(9))
+        values = parse_values(inputs + '<input id="f99" value="1"/>')
+        self.assertEqual(bytearray(81), values)
+        with self.assertRaises(SodokuException):
+            parse_values(inputs.replace('id="f88"', 'id="f99"'))
+
+    def test_parse_values_attribute_text(self):
+        inputs = ''.join('<input title=" value=7" id="f{}{}">'.format(a, b) for a in range(9) for b in range(9))
+        self.assertEqual(bytearray(81), parse_values(inputs))
+
+    def test_parse_values_comments(self):
+        inputs = ''.join('<input id="f{}{}" value="{}"/>'.format(a, b, 3 if a == b == 0 else '')
+                         for a in range(9) for b in range(9))
+        values = parse_values('<!-- <input id="f00" value="9"/> -->' + inputs)
+        self.assertEqual(3, values[0])
+        with self.assertRaises(SodokuException):
+            parse_values(inputs.replace('<input id="f88" value=""/>', '<!-- <input id="f88" value=""/> -->'))
+
+    def test_parse_values_fallback(self):
+        # Character references are left to BeautifulSoup.
+        inputs = ''.join('<input id="f{}{}" value="{}"/>'.format(a, b, '&#55;' if a == 2 and b == 3 else '')
+                         for a in range(9) for b in range(9))
+        values = parse_values(inputs)
+        self.assertEqual(7, values[21])
+        self.assertEqual(1, sum(1 for value in values if value))
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,131 @@
+from unittest import TestCase, main
+import os
+import tempfile
+
+from sodoku import CompactBoard, SodokuException, PuzzleStore, SolutionCache, solve_many
+from sodoku.store import HEADER, HEADER_SIZE, MAGIC, RECORD_SIZE
+
+PUZZLE = CompactBoard.from_line('003020600900305001001806400008102900700000008006708200002609500800203009005010300')
+SOLUTION = CompactBoard.from_line('483921657967345821251876493548132976729564138136798245372689514814253769695417382')
+
+
+def grid(number):
+    values = bytearray(81)
+    for index, digit in enumerate('{:081d}'.format(number)):
+        values[index] = int(digit)
+    return bytes(values)
+
+
+class TestPuzzleStore(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'puzzles.store')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_get_and_set(self):
+        with PuzzleStore(self.path) as store:
+            self.assertIsNone(store.get(bytes(PUZZLE)))
+            self.assertNotIn(bytes(PUZZLE), store)
+            store[bytes(PUZZLE)] = bytes(SOLUTION)
+            solution = store[bytes(PUZZLE)]
+            self.assertIsInstance(solution, memoryview)
+            self.assertEqual(bytes(SOLUTION), solution)
+            self.assertEqual(1, len(store))
+            with self.assertRaises(KeyError):
+                store[bytes(SOLUTION)]
+
+    def test_persistent(self):
+        with PuzzleStore(self.path) as store:
+            store[bytes(PUZZLE)] = bytes(SOLUTION)
+        with PuzzleStore(self.path, readonly=True) as store:
+            self.assertEqual(bytes(SOLUTION), store[bytes(PUZZLE)])
+            with self.assertRaises(SodokuException):
+                store[bytes(SOLUTION)] = bytes(SOLUTION)
+
+    def test_grow(self):
+        with PuzzleStore(self.path, capacity=4) as store:
+            for number in range(50):
+                store[grid(number)] = grid(number + 1)
+            self.assertEqual(50, len(store))
+            self.assertLessEqual(100, store.capacity)
+            for number in range(50):
+                self.assertEqual(grid(number + 1), store[grid(number)])
+
+    def test_reader_sees_writes(self):
+        writer = PuzzleStore(self.path, capacity=4)
+        reader = PuzzleStore(self.path, readonly=True)
+        writer[grid(1)] = grid(2)
+        self.assertEqual(grid(2), reader[grid(1)])
+        for number in range(2, 20):
+            writer[grid(number)] = grid(number)
+        self.assertEqual(grid(7), reader[grid(7)])
+        reader.close()
+        writer.close()
+
+    def test_bad_input(self):
+        with self.assertRaises(SodokuException):
+            PuzzleStore(self.path, readonly=True)
+        with open(self.path, 'wb') as f:
+            f.write(b'\0' * 1024)
+        with self.assertRaises(SodokuException):
+            PuzzleStore(self.path)
+
+    def test_malformed_files(self):
+        for contents in (b'', HEADER.pack(MAGIC, 0, 0) + bytes(4), HEADER.pack(MAGIC, 4, 0),
+                         HEADER.pack(MAGIC, 4, 4).ljust(HEADER_SIZE + 4 * RECORD_SIZE, b'\0'),
+                         HEADER.pack(MAGIC, 4, 0).ljust(HEADER_SIZE + 3 * RECORD_SIZE, b'\xff')):
+            with open(self.path, 'wb') as f:
+                f.write(contents)
+            for readonly in (False, True):
+                with self.assertRaises(SodokuException):
+                    PuzzleStore(self.path, readonly=readonly)
+
+    def test_solution_cache(self):
+        with PuzzleStore(self.path) as store:
+            SolutionCache(store=store).solve(PUZZLE.to_board())
+        with PuzzleStore(self.path) as store:
+            cache = SolutionCache(store=store)
+            board, _ = cache.solve(PUZZLE.to_board())
+            self.assertEqual(1, cache.hits)
+            self.assertEqual(SOLUTION, CompactBoard.from_board(board))
+
+    def test_solve_many(self):
+        with PuzzleStore(self.path) as store:
+            results = list(solve_many([PUZZLE], workers=1, store=store))
+            self.assertEqual(SOLUTION, results[0].solution)
+            self.assertEqual(bytes(SOLUTION), store[bytes(PUZZLE)])
+
+        os.remove(self.path)
+        with PuzzleStore(self.path) as store:
+            # A stored record is used as is, without solving.
+            store[bytes(PUZZLE)] = bytes(PUZZLE)
+            results = list(solve_many([PUZZLE, PUZZLE], workers=2, chunksize=1, store=store))
+            self.assertEqual([PUZZLE, PUZZLE], [result.solution for result in results])
+
+    def test_write_once(self):
+        with PuzzleStore(self.path) as store:
+            store[bytes(PUZZLE)] = bytes(SOLUTION)
+            held = store[bytes(PUZZLE)]
+            store[bytes(PUZZLE)] = bytes(PUZZLE)
+            self.assertEqual(bytes(SOLUTION), held)
+            self.assertEqual(bytes(SOLUTION), store[bytes(PUZZLE)])
+            self.assertEqual(1, len(store))
+
+    def test_bad_values(self):
+        with PuzzleStore(self.path) as store:
+            key = bytearray(PUZZLE.values)
+            key[0] = 0xFF
+            for bad in (bytes(key), bytes([10]) * 81):
+                with self.assertRaises(SodokuException):
+                    store[bad] = bytes(SOLUTION)
+                with self.assertRaises(SodokuException):
+                    store[bytes(PUZZLE)] = bad
+                with self.assertRaises(SodokuException):
+                    store.get(bad)
+            self.assertEqual(0, len(store))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+from unittest import TestCase, main
+import io
+import os
+import shutil
+import tempfile
+
+from sodoku import Board, CompactBoard, SodokuException, read_puzzles, write_puzzles, solve_many
+
+PUZZLES = [
+    '003020600900305001001806400008102900700000008006708200002609500800203009005010300',
+    '4.....8.5.3..........7......2.....6.....8.4......1.......6.3.7.5..2.....1.4......',
+]
+
+
+class TestStream(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def test_parse_line(self):
+        board = CompactBoard.from_line(PUZZLES[1])
+        self.assertEqual(4, board[0][0].value)
+        self.assertIsNone(board[0][1].value)
+        self.assertEqual(PUZZLES[1], board.to_line())
+        self.assertEqual(PUZZLES[0], CompactBoard.from_line(PUZZLES[0].encode()).to_line('0'))
+
+        with self.assertRaises(SodokuException):
+            CompactBoard.from_line(PUZZLES[0][:-1])
+        with self.assertRaises(SodokuException):
+            CompactBoard.from_line('x' + PUZZLES[0][1:])
+
+    def test_round_trip(self):
+        for name, use_mmap in (('plain.txt', False), ('mapped.txt', True), ('packed.txt.gz', False)):
+            path = self.path(name)
+            boards = [CompactBoard.from_line(puzzle) for puzzle in PUZZLES]
+            self.assertEqual(2, write_puzzles(path, boards))
+            self.assertEqual(boards, list(read_puzzles(path, use_mmap=use_mmap)))
+
+        with open(self.path('packed.txt.gz'), 'rb') as f:
+            self.assertEqual(b'\x1f\x8b', f.read(2))
+
+    def test_file_objects(self):
+        source = io.StringIO('# a comment\n\n{} first\n{}\n'.format(*PUZZLES))
+        boards = list(read_puzzles(source, as_board=True))
+        self.assertEqual(2, len(boards))
+        self.assertIsInstance(boards[0], Board)
+        self.assertEqual(3, boards[0][0][2].value)
+
+        target = io.StringIO()
+        write_puzzles(target, boards, blank='0')
+        self.assertEqual(PUZZLES[0], target.getvalue().splitlines()[0])
+
+    def test_empty_file(self):
+        path = self.path('empty.txt')
+        open(path, 'w').close()
+        self.assertEqual([], list(read_puzzles(path, use_mmap=True)))
+
+    def test_solve_stream(self):
+        path = self.path('puzzles.txt.gz')
+        write_puzzles(path, (CompactBoard.from_line(puzzle) for puzzle in PUZZLES))
+        solutions = self.path('solutions.txt')
+        write_puzzles(solutions, (result.solution for result in solve_many(read_puzzles(path), workers=1)))
+        self.assertTrue(all(board.is_complete for board in read_puzzles(solutions)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+from unittest import TestCase, main
+import time
+
+from sodoku import Board, SodokuException, Trail, propagate, solve
+from sodoku.variants import (CageConstraint, ConstraintExceptionCage, ConstraintExceptionDiagonal,
+                             ConstraintExceptionPair, anti_knight_constraints, cage_combinations,
+                             can_fill, diagonal_constraints, killer_cages)
+
+SOLVED = '654179238123864579879532146481395762732641985596728314947283651265417893318956427'
+
+
+def quiet_solve(board):
+    return solve(board, displayer=lambda string: None)
+
+
+def values(board):
+    return [cell.value for cell in board.cells.flat]
+
+
+class TestDiagonal(TestCase):
+    def test_duplicate(self):
+        board = Board()
+        board.add_constraints(diagonal_constraints(board))
+        board.cells[0][0].value = 5
+        self.assertNotIn(5, board.cells[4][4].remaining_options)
+        with self.assertRaises(ConstraintExceptionDiagonal):
+            board.cells[4][4].value = 5
+
+    def test_solve(self):
+        board = Board()
+        board.add_constraints(diagonal_constraints(board))
+        solved_board, _ = quiet_solve(board)
+        self.assertTrue(solved_board.is_complete)
+        self.assertEqual(2, len(solved_board.variants))
+        grid = values(solved_board)
+        self.assertEqual(set(range(1, 10)), set(grid[i * 10] for i in range(9)))
+        self.assertEqual(set(range(1, 10)), set(grid[i * 8 + 8] for i in range(9)))
+
+    def test_places(self):
+        board = Board()
+        board.add_constraints(diagonal_constraints(board))
+        self.assertEqual(29, len(board.units))
+        # A 1 in the first row, second column takes (0, 0), (1, 1) and (2, 2)
+        # out of the main diagonal.
+        board.cells[0][1].value = 1
+        self.assertEqual(6, board.places[27][1])
+        self.assertEqual(7, board.places[28][1])
+
+
+class TestAntiKnight(TestCase):
+    def test_duplicate(self):
+        board = Board()
+        board.add_constraints(anti_knight_constraints(board))
+        board.cells[3][4].value = 7
+        self.assertNotIn(7, board.cells[4][6].remaining_options)
+        self.assertIn(7, board.cells[4][7].remaining_options)
+        with self.assertRaises(ConstraintExceptionPair):
+            board.cells[4][6].value = 7
+
+    def test_solve(self):
+        board = Board()
+        board.add_constraints(anti_knight_constraints(board))
+        solved_board, _ = quiet_solve(board)
+        self.assertTrue(solved_board.is_complete)
+        grid = values(solved_board)
+        for row in range(9):
+            for col in range(9):
+                for other_row, other_col in ((row + 1, col + 2), (row + 2, col + 1), (row + 1, col - 2),
+                                             (row + 2, col - 1)):
+                    if 0 <= other_row < 9 and 0 <= other_col < 9:
+                        self.assertNotEqual(grid[row * 9 + col], grid[other_row * 9 + other_col])
+
+
+class TestKillerCages(TestCase):
+    def test_combinations(self):
+        self.assertEqual((0b11,), cage_combinations(9, 2, 3))
+        self.assertEqual((0b111111111,), cage_combinations(9, 9, 45))
+        self.assertEqual(4, len(cage_combinations(9, 2, 10)))
+        with self.assertRaises(SodokuException):
+            CageConstraint(Board().cells.flat[:2], 2)
+
+    def test_pruning(self):
+        board = Board()
+        board.add_constraints(killer_cages(board, [(3, (0, 1)), (23, (2, 3, 4))]))
+        self.assertEqual({1, 2}, board.cells[0][0].remaining_options)
+        self.assertEqual({6, 8, 9}, board.cells[0][3].remaining_options)
+        board.cells[0][0].value = 2
+        self.assertEqual({1}, board.cells[0][1].remaining_options)
+        board.cells[0][2].value = 9
+        self.assertEqual({6, 8}, board.cells[0][4].remaining_options)
+        board.cells[0][2].value = None
+        self.assertEqual({6, 8, 9}, board.cells[0][4].remaining_options)
+
+    def test_propagate(self):
+        # With 9 and 8 in the row, 1 and 2 have no partner left in a 10 cage.
+        board = Board()
+        board.add_constraints(killer_cages(board, [(10, (0, 1))]))
+        board.cells[0][5].value = 9
+        board.cells[0][6].value = 8
+        self.assertEqual({1, 2, 3, 4, 6, 7}, board.cells[0][0].remaining_options)
+        self.assertFalse(board.propagators[0].propagate(board, Trail()) is None)
+        self.assertEqual({3, 4, 6, 7}, board.cells[0][0].remaining_options)
+        self.assertEqual({3, 4, 6, 7}, board.cells[0][1].remaining_options)
+
+    def test_propagate_no_fit(self):
+        # 1 + 2 + 3 is the only way to make 6, and the box already holds a 3.
+        board = Board()
+        board.add_constraints(killer_cages(board, [(6, (0, 1, 2))]))
+        board.cells[1][1].value = 3
+        self.assertIsNone(board.propagators[0].propagate(board, Trail()))
+        self.assertFalse(propagate(board))
+
+    def test_can_fill(self):
+        self.assertTrue(can_fill([0b011, 0b001, 0b110]))
+        self.assertFalse(can_fill([0b001, 0b001, 0b110]))
+        self.assertFalse(can_fill([0b011, 0b011, 0b011]))
+
+    def test_wrong_sum(self):
+        board = Board()
+        board.add_constraints(killer_cages(board, [(10, (0, 1))]))
+        board.cells[0][0].value = 3
+        with self.assertRaises(ConstraintExceptionCage):
+            board.cells[0][1].value = 6
+
+    def test_solve(self):
+        solution = [int(char) for char in SOLVED]
+        cages = [(solution[i] + solution[i + 1], (i, i + 1)) for row in range(9) for i in range(row * 9, row * 9 + 8, 2)]
+        cages += [(solution[row * 9 + 8], (row * 9 + 8,)) for row in range(9)]
+        board = Board()
+        board.add_constraints(killer_cages(board, cages))
+        solved_board, _ = quiet_solve(board)
+        self.assertTrue(solved_board.is_complete)
+        grid = values(solved_board)
+        for total, indexes in cages:
+            self.assertEqual(total, sum(grid[index] for index in indexes))
+
+    def test_solve_without_givens(self):
+        solution = [int(char) for char in SOLVED]
+        cages = [(sum(solution[i:i + 3]), tuple(range(i, i + 3))) for i in range(0, 81, 3)]
+        board = Board()
+        board.add_constraints(killer_cages(board, cages))
+        started = time.perf_counter()
+        solved_board, _ = quiet_solve(board)
+        self.assertLess(time.perf_counter() - started, 10)
+        self.assertTrue(solved_board.is_complete)
+        grid = values(solved_board)
+        for total, indexes in cages:
+            self.assertEqual(total, sum(grid[index] for index in indexes))
+
+    def test_copy(self):
+        board = Board()
+        board.add_constraints(killer_cages(board, [(3, (0, 1))]))
+        other = board.copy()
+        self.assertEqual({1, 2}, other.cells[0][1].remaining_options)
+        other.cells[0][0].value = 1
+        self.assertEqual({2}, other.cells[0][1].remaining_options)
+        self.assertEqual({1, 2}, board.cells[0][1].remaining_options)
+
+
+if __name__ == '__main__':
+    main()
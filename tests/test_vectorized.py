@@ -0,0 +1,64 @@
+from unittest import TestCase, main
+
+import numpy as np
+
+from sodoku import Board, CompactBoard, solve_array, solve_exact_cover
+from sodoku import vectorized
+
+EASY = '003020600900305001001806400008102900700000008006708200002609500800203009005010300'
+MEDIUM = '981300000005000800000050004508031060043000190060740305600070000004000600000003521'
+HARD = '8..........36......7..9.2...5...7.......457.....1...3...1....68..85...1..9....4..'
+UNSOLVABLE = '12345678.' + '........9' + '.' * 63
+
+
+class TestVectorized(TestCase):
+    def test_as_array(self):
+        values = vectorized.as_array([EASY, CompactBoard.from_line(HARD), Board()])
+        self.assertEqual((3, 81), values.shape)
+        self.assertEqual(np.uint8, values.dtype)
+        self.assertEqual([CompactBoard.from_line(EASY), CompactBoard.from_line(HARD), CompactBoard()],
+                         vectorized.to_boards(values))
+
+    def test_candidates(self):
+        boards = [CompactBoard.from_line(line) for line in (EASY, HARD)]
+        masks = vectorized.candidates(vectorized.as_array(boards))
+        for board, row in zip(boards, masks):
+            for cell in board.cells:
+                self.assertEqual(0 if cell.value else cell.options_mask, row[cell.index])
+
+    def test_propagate(self):
+        values = vectorized.as_array([EASY, MEDIUM, HARD, UNSOLVABLE])
+        states = vectorized.propagate(values)
+        self.assertEqual([vectorized.SOLVED, vectorized.SOLVED, vectorized.STUCK, vectorized.DEAD], list(states))
+        self.assertEqual(solve_exact_cover(CompactBoard.from_line(MEDIUM).to_board())[0].cells.flat[2].value,
+                         values[1][2])
+        for board in vectorized.to_boards(values[:2]):
+            self.assertTrue(board.is_complete)
+
+    def test_hidden_singles(self):
+        # 1 has a single place left in the first row, though that cell has
+        # other candidates.
+        board = CompactBoard()
+        board.values[9 + 3] = board.values[18 + 6] = 1
+        board.values[27 + 1] = board.values[54 + 2] = 1
+        board.values[36 + 4] = board.values[45 + 5] = board.values[63 + 7] = board.values[72 + 8] = 1
+        values = vectorized.as_array([board])
+        masks = vectorized.candidates(values)
+        used = vectorized.unit_used(values)
+        boards, cells, digits = vectorized.hidden_singles(masks, vectorized.places(masks), used)
+        self.assertIn((0, 0, 1), list(zip(boards, cells, digits)))
+
+    def test_solve_array(self):
+        lines = [EASY, HARD, UNSOLVABLE, MEDIUM] * 3
+        values, solved = solve_array(vectorized.as_array(lines))
+        self.assertEqual([True, True, False, True] * 3, list(solved))
+        for line, board in zip(lines, vectorized.to_boards(values)):
+            if line != UNSOLVABLE:
+                self.assertTrue(board.is_complete)
+                puzzle = CompactBoard.from_line(line)
+                for given, value in zip(puzzle.values, board.values):
+                    self.assertIn(given, (0, value))
+
+
+if __name__ == '__main__':
+    main()